@@ -17,4 +17,7 @@ register(id='CliffGridWorld-v0',
 register(id='SlipperyCliffGridWorld-v0',
          entry_point='gridworldsgym.envs:CliffGridWorldV0',
          kwargs={'slippery': True}
-         )
\ No newline at end of file
+         )
+
+register(id='MapGridWorld-v0',
+         entry_point='gridworldsgym.envs:MapGridWorldV0')
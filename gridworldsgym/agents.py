@@ -0,0 +1,110 @@
+""" Tabular Q-learning, SARSA and Expected SARSA for a batch of agents, each with its own Q table and
+    hyperparameters, learning on its own copy of an environment in a GridWorldVectorEnv.
+
+    The Q tables of all agents are one [num_agents, num_states, num_actions] array, and acting and learning
+    are single vectorized operations over the batch, so a sweep over alpha, gamma or epsilon runs in one
+    process. alpha, gamma and epsilon are either scalars shared by all agents or arrays with one value per agent.
+"""
+from collections import namedtuple
+
+import numpy as np
+from gym.utils import seeding
+
+TrainingResult = namedtuple('TrainingResult', ['agents', 'returns', 'lengths', 'steps'])
+
+
+class TabularAgents(object):
+    """ Epsilon-greedy agents that learn by one step temporal difference updates. Subclasses define the
+        value of the next state that the target bootstraps from. """
+
+    def __init__(self, num_agents, num_states, num_actions, alpha=0.1, gamma=0.99, epsilon=0.1, seed=None):
+        self.num_agents = num_agents
+        self.num_states = num_states
+        self.num_actions = num_actions
+        self.alpha = np.broadcast_to(np.asarray(alpha, dtype=np.float64), (num_agents,))
+        self.gamma = np.broadcast_to(np.asarray(gamma, dtype=np.float64), (num_agents,))
+        self.epsilon = np.broadcast_to(np.asarray(epsilon, dtype=np.float64), (num_agents,))
+        self.q = np.zeros((num_agents, num_states, num_actions))
+        self.agents = np.arange(num_agents)
+        self.np_random = None
+        self.seed(seed)
+
+    @classmethod
+    def for_env(cls, env, num_agents, **kwargs):
+        return cls(num_agents, env.observation_space.n, env.action_space.n, **kwargs)
+
+    def seed(self, seed=None):
+        self.np_random, seed = seeding.np_random(seed)
+        return [seed]
+
+    def greedy(self, states):
+        return self.q[self.agents, states].argmax(axis=1)
+
+    def act(self, states):
+        """ Epsilon-greedy actions of every agent in its state. """
+        explore = self.np_random.rand(self.num_agents) < self.epsilon
+        random_actions = self.np_random.randint(self.num_actions, size=self.num_agents)
+        return np.where(explore, random_actions, self.greedy(states))
+
+    def update(self, states, actions, rewards, next_states, dones, next_actions=None):
+        """ Moves Q(state, action) of every agent alpha of the way to its target. Transitions flagged done
+            do not bootstrap. next_actions, the actions the agents will take next, is only used by SARSA. """
+        bootstrap = np.where(dones, 0.0, self._next_value(next_states, next_actions))
+        target = rewards + self.gamma * bootstrap
+        q = self.q[self.agents, states, actions]
+        self.q[self.agents, states, actions] = q + self.alpha * (target - q)
+
+    def _next_value(self, next_states, next_actions):
+        raise NotImplementedError
+
+
+class QLearning(TabularAgents):
+
+    def _next_value(self, next_states, next_actions):
+        return self.q[self.agents, next_states].max(axis=1)
+
+
+class Sarsa(TabularAgents):
+
+    def _next_value(self, next_states, next_actions):
+        return self.q[self.agents, next_states, next_actions]
+
+
+class ExpectedSarsa(TabularAgents):
+
+    def _next_value(self, next_states, next_actions):
+        q = self.q[self.agents, next_states]
+        return (1 - self.epsilon) * q.max(axis=1) + self.epsilon * q.mean(axis=1)
+
+
+def train(envs, agents, num_steps):
+    """ Steps agent i on copy i of the vector environment envs for num_steps steps, learning after each.
+        Copies are reset by envs when an episode ends; a SARSA agent's next action is the one it takes in
+        the state it was reset to, which the update ignores since the episode is done.
+        Returns a TrainingResult with, for every episode finished, in the order they finished, the agent,
+        its undiscounted return, its length and the step it finished on.
+    """
+    if envs.num_envs != agents.num_agents:
+        raise ValueError('envs has {} copies for {} agents'.format(envs.num_envs, agents.num_agents))
+    states = envs.reset()
+    actions = agents.act(states)
+    episode_returns = np.zeros(agents.num_agents)
+    episode_lengths = np.zeros(agents.num_agents, dtype=np.int64)
+    finished = []
+    for step in range(num_steps):
+        next_states, rewards, dones, infos = envs.step(actions)
+        # the next action is chosen before learning, as SARSA needs it for its target
+        next_actions = agents.act(next_states)
+        agents.update(states, actions, rewards, infos['terminal_state'], dones, next_actions)
+        episode_returns += rewards
+        episode_lengths += 1
+        if dones.any():
+            done_agents = np.flatnonzero(dones)
+            finished.append((done_agents, episode_returns[done_agents], episode_lengths[done_agents],
+                             np.full(len(done_agents), step)))
+            episode_returns[done_agents] = 0.0
+            episode_lengths[done_agents] = 0
+        states, actions = next_states, next_actions
+    if not finished:
+        return TrainingResult(*[np.zeros(0, dtype=dtype) for dtype in [np.int64, np.float64, np.int64, np.int64]])
+    return TrainingResult(*[np.concatenate(arrays) for arrays in zip(*finished)])
@@ -0,0 +1,186 @@
+""" Benchmarks of stepping, construction, rendering and import, written as JSON so that results from different
+    releases can be compared.
+
+    python -m gridworldsgym.benchmark --output results.json
+    python -m gridworldsgym.benchmark --sizes 4x3 100x100 2000x2000 --steps 100000
+"""
+import argparse
+import json
+import platform
+import subprocess
+import sys
+import time
+import tracemalloc
+
+import gym
+import numpy as np
+
+import gridworldsgym
+from gridworldsgym.envs.cache import model_cache
+from gridworldsgym.envs.vector import GridWorldVectorEnv
+from gridworldsgym.util import kernels
+
+DEFAULT_SIZES = ['4x3', '100x100', '500x500', '1000x1000', '2000x2000']
+
+# ids whose layouts only go up to some width, e.g. WindyGridWorld-v0's wind for each of its columns
+MAX_WIDTHS = {'WindyGridWorld-v0': 10}
+
+IMPORT_SCRIPT = '''
+import json, time
+start = time.perf_counter()
+import gym
+gym_loaded = time.perf_counter()
+import gridworldsgym.envs
+imported = time.perf_counter()
+env = gym.make('GridWorld-v0')
+made = time.perf_counter()
+env.reset()
+env.step(0)
+stepped = time.perf_counter()
+print(json.dumps({'gym': gym_loaded - start, 'gridworldsgym': imported - gym_loaded, 'make': made - imported,
+                  'first_step': stepped - made}))
+'''
+
+
+def registered_ids():
+    return sorted(spec.id for spec in gym.envs.registry.all() if str(spec.entry_point).startswith('gridworldsgym'))
+
+
+def _rate(count, seconds):
+    return count / seconds if seconds > 0 else float('inf')
+
+
+def step_throughput(env_id, num_steps, seed=0):
+    """ Steps per second of env.step, with uniformly random actions and a reset whenever an episode ends. """
+    env = gym.make(env_id)
+    env.seed(seed)
+    env.reset()
+    actions = np.random.RandomState(seed).randint(env.action_space.n, size=num_steps).tolist()
+    start = time.perf_counter()
+    for action in actions:
+        if env.step(action)[2]:
+            env.reset()
+    elapsed = time.perf_counter() - start
+    return {'steps': num_steps, 'seconds': elapsed, 'steps_per_second': _rate(num_steps, elapsed)}
+
+
+def vector_step_throughput(env_id, num_envs, num_steps, seed=0):
+    """ Environment steps per second of a GridWorldVectorEnv with num_envs copies. """
+    envs = GridWorldVectorEnv(env_id, num_envs)
+    envs.seed(seed)
+    envs.reset()
+    actions = np.random.RandomState(seed).randint(envs.single_action_space.n, size=(num_steps, num_envs))
+    start = time.perf_counter()
+    for step_actions in actions:
+        envs.step(step_actions)
+    elapsed = time.perf_counter() - start
+    return {'num_envs': num_envs, 'steps': num_steps * num_envs, 'seconds': elapsed,
+            'steps_per_second': _rate(num_steps * num_envs, elapsed)}
+
+
+def construction(env_id, width, height):
+    """ Seconds to make a width by height environment and build its model, with an empty model cache, and the
+        peak memory allocated while doing so as seen by tracemalloc, which includes NumPy arrays. """
+    model_cache.clear()
+    start = time.perf_counter()
+    env = gym.make(env_id, width=width, height=height)
+    env.unwrapped.model
+    elapsed = time.perf_counter() - start
+    del env
+    model_cache.clear()
+
+    tracemalloc.start()
+    try:
+        env = gym.make(env_id, width=width, height=height)
+        env.unwrapped.model
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    del env
+    model_cache.clear()
+    return {'env_id': env_id, 'width': width, 'height': height, 'num_states': width * height,
+            'seconds': elapsed, 'peak_bytes': peak}
+
+
+def render_throughput(env_id, num_frames, seed=0):
+    """ Frames per second of env.render(mode='rgb_array') while stepping with random actions. """
+    env = gym.make(env_id)
+    env.seed(seed)
+    env.reset()
+    env.render(mode='rgb_array')
+    actions = np.random.RandomState(seed).randint(env.action_space.n, size=num_frames).tolist()
+    start = time.perf_counter()
+    for action in actions:
+        if env.step(action)[2]:
+            env.reset()
+        env.render(mode='rgb_array')
+    elapsed = time.perf_counter() - start
+    env.close()
+    return {'frames': num_frames, 'seconds': elapsed, 'frames_per_second': _rate(num_frames, elapsed)}
+
+
+def import_time(repeat=5):
+    """ Median seconds to import gym, then gridworldsgym.envs, to make GridWorld-v0 and to reset and take its
+        first step, in fresh interpreters. """
+    times = []
+    for _ in range(repeat):
+        output = subprocess.check_output([sys.executable, '-W', 'ignore', '-c', IMPORT_SCRIPT])
+        times.append(json.loads(output.decode().splitlines()[-1]))
+    return {name: float(np.median([t[name] for t in times])) for name in ['gym', 'gridworldsgym', 'make',
+                                                                          'first_step']}
+
+
+def parse_size(size):
+    width, height = size.lower().split('x')
+    return int(width), int(height)
+
+
+def run(env_ids=None, num_steps=100000, num_envs=1000, vector_steps=100, sizes=DEFAULT_SIZES,
+        size_env_id='GridWorld-v0', num_frames=1000, import_repeat=5):
+    env_ids = env_ids or registered_ids()
+    return {
+        'system': {
+            'time': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'numpy': np.__version__,
+            'gym': gym.__version__,
+            'backend': kernels.backend,
+        },
+        'import': import_time(import_repeat),
+        'step': {env_id: step_throughput(env_id, num_steps) for env_id in env_ids},
+        'vector_step': {env_id: vector_step_throughput(env_id, num_envs, vector_steps) for env_id in env_ids},
+        'construction': [construction(size_env_id, *parse_size(size)) for size in sizes],
+        'render': {env_id: render_throughput(env_id, num_frames) for env_id in env_ids},
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m gridworldsgym.benchmark', description=__doc__.split('\n')[0])
+    parser.add_argument('--output', '-o', help='file to write the JSON results to, standard output by default')
+    parser.add_argument('--env-ids', nargs='+', help='ids to benchmark, every gridworldsgym id by default')
+    parser.add_argument('--steps', type=int, default=100000, help='steps timed per environment')
+    parser.add_argument('--num-envs', type=int, default=1000, help='copies stepped by the vector environment')
+    parser.add_argument('--vector-steps', type=int, default=100, help='steps timed per vector environment')
+    parser.add_argument('--sizes', nargs='+', default=DEFAULT_SIZES, help='WIDTHxHEIGHT grids to construct')
+    parser.add_argument('--size-env-id', default='GridWorld-v0', help='id constructed at each size')
+    parser.add_argument('--frames', type=int, default=1000, help='frames rendered per environment')
+    parser.add_argument('--import-repeat', type=int, default=5, help='fresh interpreters timed importing')
+    args = parser.parse_args(argv)
+    width = MAX_WIDTHS.get(args.size_env_id)
+    if width is not None and any(parse_size(size)[0] > width for size in args.sizes):
+        parser.error('--size-env-id {} is at most {} columns wide, so no size can be wider'.format(
+            args.size_env_id, width))
+
+    results = run(args.env_ids, args.steps, args.num_envs, args.vector_steps, args.sizes, args.size_env_id,
+                  args.frames, args.import_repeat)
+    text = json.dumps(results, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(text + '\n')
+    else:
+        print(text)
+
+
+if __name__ == '__main__':
+    main()
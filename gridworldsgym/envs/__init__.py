@@ -1,3 +1,6 @@
 from gridworldsgym.envs.gridworld import GridWorldV0
 from gridworldsgym.envs.windy_gridworld import WindyGridWorldV0
 from gridworldsgym.envs.cliff_world import CliffGridWorldV0
+from gridworldsgym.envs.vector import GridWorldVectorEnv
+from gridworldsgym.envs.shared_memory import SharedMemoryVectorEnv
+from gridworldsgym.envs.grid_map import GridMap, MapGridWorldV0
@@ -0,0 +1,128 @@
+import json
+import os
+import shutil
+import tempfile
+from collections import OrderedDict
+
+import numpy as np
+
+from gridworldsgym.envs.model import TransitionModel
+
+# The version of the models saved to disk, part of their path. Keys only digest what a model is built from, so
+# this must be bumped whenever a change to how models are generated or saved makes earlier files wrong.
+MODEL_VERSION = 2
+
+
+class ModelCache(object):
+    """ Least recently used cache of compiled TransitionModels, keyed by a digest of everything the model is
+        built from, so that environments with the same layout share one read-only model instead of each
+        building its own. At most max_size models, and max_bytes bytes of model arrays, are kept in memory.
+        If directory is set, models are also written there as .npy files and later processes open them with
+        np.load(mmap_mode='r'), which maps the file instead of reading it: starting another environment
+        then costs neither build time nor private memory. Only models of at least min_disk_bytes are written,
+        as smaller ones, e.g. generated levels, build faster than their files are read, and the least recently
+        used are deleted once the directory holds more than max_disk_bytes of them.
+    """
+
+    def __init__(self, max_size=16, max_bytes=2 ** 30, directory=None, min_disk_bytes=2 ** 20,
+                 max_disk_bytes=2 ** 32):
+        self.max_size = max_size
+        self.max_bytes = max_bytes
+        self.directory = directory
+        self.min_disk_bytes = min_disk_bytes
+        self.max_disk_bytes = max_disk_bytes
+        self.models = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get_or_build(self, key, build):
+        model = self.models.get(key)
+        if model is not None:
+            self.models.move_to_end(key)
+            self.hits += 1
+            return model
+        self.misses += 1
+        model = self._load(key) if self.directory else None
+        if model is None:
+            model = build()
+            for array in model.to_arrays().values():
+                array.flags.writeable = False
+            if self.directory and _nbytes(model) >= self.min_disk_bytes:
+                self._save(key, model)
+                self._prune_disk()
+        self.models[key] = model
+        self._evict()
+        return model
+
+    def clear(self):
+        self.models.clear()
+
+    def _evict(self):
+        total = sum(_nbytes(model) for model in self.models.values())
+        while len(self.models) > self.max_size or (total > self.max_bytes and len(self.models) > 1):
+            _, model = self.models.popitem(last=False)
+            total -= _nbytes(model)
+
+    def _version_directory(self):
+        return os.path.join(self.directory, 'v{}'.format(MODEL_VERSION))
+
+    def _path(self, key):
+        return os.path.join(self._version_directory(), key)
+
+    def _load(self, key):
+        path = self._path(key)
+        if not os.path.isdir(path):
+            return None
+        try:
+            # the modification time of a model's directory is when it was last used, for _prune_disk
+            os.utime(path)
+            with open(os.path.join(path, 'meta.json')) as f:
+                meta = json.load(f)
+            # models of uniform rows are saved without indptr
+            arrays = {name: np.load(os.path.join(path, name + '.npy'), mmap_mode='r')
+                      for name in TransitionModel.ARRAYS if os.path.exists(os.path.join(path, name + '.npy'))}
+        except OSError:
+            # another process pruned the model while it was being loaded, so it is built again
+            return None
+        return TransitionModel.from_arrays(meta['num_states'], meta['num_actions'], arrays)
+
+    def _save(self, key, model):
+        # written to a temporary directory first, so other processes only ever see complete models
+        os.makedirs(self._version_directory(), exist_ok=True)
+        tmp = tempfile.mkdtemp(dir=self._version_directory(), prefix='.' + key)
+        for name, array in model.to_arrays().items():
+            np.save(os.path.join(tmp, name + '.npy'), array)
+        with open(os.path.join(tmp, 'meta.json'), 'w') as f:
+            json.dump({'num_states': model.num_states, 'num_actions': model.num_actions}, f)
+        try:
+            os.rename(tmp, self._path(key))
+        except OSError:
+            # another process saved the same model first
+            shutil.rmtree(tmp, ignore_errors=True)
+
+    def _prune_disk(self):
+        # deletes the least recently used models until the rest fit in max_disk_bytes; processes that have
+        # a deleted model mapped keep reading it, as the files only go once nothing maps them
+        models = []
+        for entry in os.scandir(self._version_directory()):
+            if entry.is_dir() and not entry.name.startswith('.'):
+                try:
+                    size = sum(f.stat().st_size for f in os.scandir(entry.path))
+                    models.append((entry.stat().st_mtime, size, entry.path))
+                except FileNotFoundError:
+                    # another process pruned it already
+                    continue
+        total = sum(size for _, size, _ in models)
+        for _, size, path in sorted(models):
+            if total <= self.max_disk_bytes:
+                break
+            shutil.rmtree(path, ignore_errors=True)
+            total -= size
+
+
+def _nbytes(model):
+    # arrays can be shared, e.g. probs and cdf of single outcome rows
+    return sum({id(array): array.nbytes for array in model.to_arrays().values()}.values())
+
+
+model_cache = ModelCache(directory=os.environ.get('GRIDWORLDSGYM_MODEL_CACHE'))
@@ -4,18 +4,19 @@ from gridworldsgym.envs import GridWorldV0
 
 class CliffGridWorldV0(GridWorldV0):
     # TODO: Add doc string
-    def __init__(self, width=12, height=4, slippery=False):
-        super(CliffGridWorldV0, self).__init__(width, height, slippery=slippery)
-        self.isd = np.zeros(self.num_states)
-        self.isd[self._to_state(3, 0)] = 1.0
-        self.goal_states = [(3, self.width - 1)]
-        self.terminal_states = [(3, i) for i in range(1, self.width - 1)]
-        self.illegal_states = []
-        self.transitions = self._generate_transitions()
-        self.rewards = self._generate_rewards()
+    def __init__(self, width=12, height=4, slippery=False, compact=False, block_size=None):
+        super(CliffGridWorldV0, self).__init__(width, height, slippery=slippery, compact=compact,
+                                               block_size=block_size)
+
+    def _generate_isd(self, num_states):
+        isd = np.zeros(num_states)
+        isd[self._to_state(3, 0)] = 1.0
+        return isd
+
+    def _generate_layout(self):
+        return [(3, self.width - 1)], [(3, i) for i in range(1, self.width - 1)], []
 
     def _generate_rewards(self):
         rewards = -1.0 * np.ones(self.num_states)
-        for i in range(1, self.width - 1):
-            rewards[self._to_state(3, i)] = -100
+        rewards[self._to_state(3, 1):self._to_state(3, self.width - 1)] = -100
         return rewards
@@ -1,11 +1,18 @@
+import copy
+import time
+
 import numpy as np
 import gym
 from gym import spaces
 from gym.utils import seeding
 
+from gridworldsgym.envs.model import TransitionModel
+from gridworldsgym.util import instrumentation, kernels
+from gridworldsgym.util import seeding as streams
+
 
 class FiniteStateMDP(gym.Env):
-    def __init__(self, num_states, num_actions, isd=None):
+    def __init__(self, num_states, num_actions, isd=None, block_size=None):
         self.num_states = num_states
         self.num_actions = num_actions
         self.np_random = None
@@ -13,36 +20,132 @@ class FiniteStateMDP(gym.Env):
         self.observation_space = spaces.Discrete(self.num_states)
         self.isd = isd
         self.last_action = None
+        self._model = None
+        # with a block_size, seeds make a SeedSequence stream whose uniforms are drawn block_size at a time
+        self.block_size = block_size
+        self._uniforms = None
         self.seed()
         self.reward = []
         self.state = self.reset()
 
     def seed(self, seed=None):
-        self.np_random, seed = seeding.np_random(seed)
-        return [seed]
+        if self.block_size is None:
+            self.np_random, seed = seeding.np_random(seed)
+            return [seed]
+        self.np_random, sequence = streams.np_random(seed)
+        self._uniforms = streams.UniformBuffer(self.np_random, self.block_size)
+        return [sequence.entropy]
 
     def reset(self):
+        if instrumentation.enabled:
+            return self._timed('reset', self._reset)
+        return self._reset()
+
+    def _reset(self):
         if self.isd is not None:
             self.state = self._sample(self.isd)
             self.last_action = None
             return self.state
 
     def step(self, action):
-        transitions = self.P(self.state, action)
-        index = self._sample([t[0] for t in transitions])
-        prob, state, done = transitions[index]
-        reward = self.R(state, action)
+        if instrumentation.enabled:
+            return self._timed_step(action)
+        model = self.model
+        if kernels.compiled is not None:
+            return self._compiled_step(model, action)
+        return self._take(model, model.sample(self.state, action, self._uniform()), action)
+
+    def _compiled_step(self, model, action):
+        # step in a single kernel call, which also skips the lookups and conversions of _take
+        state, reward, done, prob = kernels.compiled.step(
+            *model._kernel_args(), model.cdf, model.next_states, model.rewards, model.dones, model.probs,
+            self.state * self.num_actions + action, model.cdf.dtype.type(self._uniform()))
         self.state = state
         self.last_action = action
         return state, reward, done, {"prob": prob}
 
+    def _take(self, model, index, action):
+        # moves to the sampled outcome index and returns what step returns
+        state = int(model.next_states[index])
+        self.state = state
+        self.last_action = action
+        return state, model.rewards[index], bool(model.dones[index]), {"prob": float(model.probs[index])}
+
+    def _timed_step(self, action):
+        # step, kept separate so that step itself only pays for checking instrumentation.enabled
+        start = time.perf_counter()
+        model = self.model
+        index = model.sample(self.state, action, self._uniform())
+        sampled = time.perf_counter()
+        result = self._take(model, index, action)
+        stats = instrumentation.thread_stats()
+        stats.record('sample', sampled - start)
+        stats.record('step', time.perf_counter() - start)
+        if result[2]:
+            stats.count('episodes')
+        return result
+
+    def _timed(self, name, method, *args, **kwargs):
+        start = time.perf_counter()
+        result = method(*args, **kwargs)
+        instrumentation.thread_stats().record(name, time.perf_counter() - start)
+        return result
+
+    def get_state(self):
+        """ A snapshot of what step and reset change: the state, the last action and the random number
+            generator, for set_state. Neither the model nor anything else that steps never change is copied. """
+        if self._uniforms is None:
+            random_state = streams.get_rng_state(self.np_random)
+        else:
+            random_state = self._uniforms.get_state()
+        return self.state, self.last_action, random_state
+
+    def set_state(self, snapshot):
+        self.state, self.last_action, random_state = snapshot
+        if self._uniforms is None:
+            streams.set_rng_state(self.np_random, random_state)
+        else:
+            self._uniforms.set_state(random_state)
+
+    def fork(self):
+        """ A copy in the current state with its own random number generator, which shares the model and
+            everything else that steps never change with this environment. """
+        clone = copy.copy(self)
+        clone.np_random = streams.copy_rng(self.np_random)
+        if self._uniforms is not None:
+            clone._uniforms = copy.copy(self._uniforms)
+            clone._uniforms.generator = clone.np_random
+            clone._uniforms.block = self._uniforms.block.copy()
+        return clone
+
+    @property
+    def model(self):
+        """ The TransitionModel compiled from P and R, built on first use. """
+        if self._model is None:
+            if instrumentation.enabled:
+                self._model = self._timed('model_build', self._build_model)
+            else:
+                self._model = self._build_model()
+        return self._model
+
+    def _build_model(self):
+        return TransitionModel.from_functions(self.num_states, self.num_actions, self.P, self.R)
+
+    def _invalidate_model(self):
+        self._model = None
+
     def render(self, mode='human'):
         raise NotImplementedError
 
     def _sample(self, probs):
         probs = np.asarray(probs)
         csprobs = np.cumsum(probs)
-        return (csprobs > self.np_random.rand()).argmax()
+        return (csprobs > self._uniform()).argmax()
+
+    def _uniform(self):
+        if self._uniforms is None:
+            return self.np_random.rand()
+        return self._uniforms.next()
 
     def P(self, state, action):
         raise NotImplementedError
@@ -0,0 +1,85 @@
+""" Shortest path distances to a goal, in steps, and the actions that follow those paths, for reward shaping,
+    choosing start states by difficulty or measuring how far a policy is from optimal.
+
+    Paths take the most likely outcome of every action, the intended move of a slippery grid, and end when they
+    reach a goal. Goal and terminal cells end episodes, so paths do not continue from them, and a step into a
+    terminal cell does not count as reaching the goal. Terminal and illegal cells are UNREACHABLE themselves.
+"""
+from collections import OrderedDict, namedtuple
+
+import numpy as np
+
+UNREACHABLE = -1
+
+# distances of UNREACHABLE where no goal can be reached, and actions of -1 there and at goals
+DistanceField = namedtuple('DistanceField', ['distances', 'actions'])
+
+# distance fields of recent layouts, keyed like the model cache but without rewards, which paths ignore
+MAX_CACHED_FIELDS = 16
+_cache = OrderedDict()
+
+
+def backward_bfs(sources, targets, num_nodes, goals):
+    """ The fewest edges, sources[i] -> targets[i], from every node to a goal node, by one breadth first search
+        backwards from all goals at once; UNREACHABLE where no goal can be reached. """
+    # the edges into each node, as ranges of predecessors[indptr[node]:indptr[node + 1]]
+    predecessors = sources[np.argsort(targets, kind='stable')]
+    indptr = np.zeros(num_nodes + 1, dtype=np.int64)
+    np.cumsum(np.bincount(targets, minlength=num_nodes), out=indptr[1:])
+    distances = np.full(num_nodes, UNREACHABLE, dtype=np.int64)
+    frontier = np.flatnonzero(goals)
+    distance = 0
+    while len(frontier):
+        distances[frontier] = distance
+        distance += 1
+        begins, counts = indptr[frontier], indptr[frontier + 1] - indptr[frontier]
+        ends = np.cumsum(counts)
+        previous = predecessors[np.repeat(begins - ends + counts, counts) + np.arange(ends[-1])]
+        frontier = np.unique(previous[distances[previous] == UNREACHABLE])
+    return distances
+
+
+def goal_distances(successors, goals, stops, dones=None):
+    """ The DistanceField of a [num_nodes, num_actions] table of the node every action leads to. goals and stops
+        are node masks, stops the goals and every other node paths do not continue from; dones, if given, flags
+        the steps that end episodes, which only reach the goal if they enter it. """
+    num_nodes, num_actions = successors.shape
+    usable = np.repeat(~stops[:, None], num_actions, axis=1)
+    if dones is not None:
+        usable &= ~dones | goals[successors]
+    sources = np.repeat(np.arange(num_nodes), num_actions)[usable.reshape(-1)]
+    distances = backward_bfs(sources, successors[usable], num_nodes, goals)
+    # the first action whose step brings the goal one step closer
+    closer = usable & (distances[successors] == (distances - 1)[:, None]) & (distances > 0)[:, None]
+    actions = np.where(closer.any(axis=1), closer.argmax(axis=1), -1)
+    return DistanceField(distances, actions)
+
+
+def distance_field(env):
+    """ The DistanceField of a GridWorldV0-family environment over states, computed from its compiled model and
+        cached per layout, so environments with the same layout share one read-only field. """
+    env = env.unwrapped
+    # hand-set transitions are not part of the layout, so their fields are not cached
+    key = repr(env._layout_key()) if env._transitions is None else None
+    field = _cache.get(key)
+    if field is not None:
+        _cache.move_to_end(key)
+        return field
+    model = env.model
+    num_rows = model.num_states * model.num_actions
+    if model.uniform_rows:
+        likely = np.arange(num_rows) * model.row_length + model.probs.reshape(num_rows, -1).argmax(axis=1)
+    else:
+        rows = np.repeat(np.arange(num_rows), np.diff(model.indptr))
+        order = np.lexsort((-model.probs, rows))
+        likely = order[model.indptr[:-1]]
+    shape = (model.num_states, model.num_actions)
+    field = goal_distances(model.next_states[likely].reshape(shape), env.goal_mask,
+                           env.goal_mask | env.terminal_mask | env.illegal_mask, model.dones[likely].reshape(shape))
+    for array in field:
+        array.flags.writeable = False
+    if key is not None:
+        _cache[key] = field
+        while len(_cache) > MAX_CACHED_FIELDS:
+            _cache.popitem(last=False)
+    return field
@@ -0,0 +1,177 @@
+import hashlib
+
+import numpy as np
+
+from gridworldsgym.envs.gridworld import GridWorldV0
+
+EMPTY, WALL, START, GOAL, TERMINAL = '.', '#', 'S', 'G', 'T'
+
+# The maps of the registered ids. Rewards and wind are given separately, see classic_map.
+GRIDWORLD = '''
+S...
+.#.T
+...G
+'''
+
+CLIFF = '''
+............
+............
+............
+STTTTTTTTTTG
+'''
+
+WINDY = '''
+..........
+..........
+..........
+S......G..
+..........
+..........
+..........
+'''
+
+
+class GridMap(object):
+    """ A grid world layout as [height, width] arrays: walls, start weights that the initial state distribution
+        is proportional to, goal and terminal cells, the reward of entering each cell and the wind in each
+        cell, the number of rows an agent leaving the cell is pushed up. wind may also be given per column.
+        Arrays that are not given default to no walls, starting in the top left cell, no goals, terminals or
+        wind, and a reward of default_reward everywhere.
+    """
+
+    def __init__(self, height, width, walls=None, start=None, goals=None, terminals=None, rewards=None,
+                 wind=None, default_reward=0.0):
+        self.height = height
+        self.width = width
+        shape = (height, width)
+        self.walls = np.zeros(shape, dtype=bool) if walls is None else np.asarray(walls, dtype=bool)
+        if start is None:
+            start = np.zeros(shape)
+            start[0, 0] = 1.0
+        self.start = np.asarray(start, dtype=np.float64)
+        self.goals = np.zeros(shape, dtype=bool) if goals is None else np.asarray(goals, dtype=bool)
+        self.terminals = np.zeros(shape, dtype=bool) if terminals is None else np.asarray(terminals, dtype=bool)
+        if rewards is None:
+            rewards = np.full(shape, default_reward)
+        self.rewards = np.asarray(rewards, dtype=np.float64)
+        self.wind = None if wind is None else np.broadcast_to(np.asarray(wind, dtype=np.int64), shape)
+        for name in ['walls', 'start', 'goals', 'terminals', 'rewards']:
+            if getattr(self, name).shape != shape:
+                raise ValueError('{} has shape {}, expected {}'.format(name, getattr(self, name).shape, shape))
+        if self.start.sum() <= 0:
+            raise ValueError('the map has no start cell')
+
+    @classmethod
+    def from_ascii(cls, text, rewards=None, wind=None, default_reward=0.0):
+        """ Parses a map with one line per row: '#' is a wall, 'S' a start cell, 'G' a goal, 'T' a terminal
+            and any other character an empty cell. rewards maps characters to the reward of entering their
+            cells, default_reward otherwise; walls get no reward. The text is parsed as a single array, so maps
+            of millions of cells load in a fraction of a second.
+        """
+        lines = text.strip('\n').split('\n')
+        width = len(lines[0])
+        if any(len(line) != width for line in lines):
+            raise ValueError('every line of the map must have the same length')
+        cells = np.frombuffer(''.join(lines).encode('latin-1'), dtype=np.uint8).reshape(len(lines), width)
+        reward_table = np.full(256, default_reward)
+        for char, reward in (rewards or {}).items():
+            reward_table[ord(char)] = reward
+        walls = cells == ord(WALL)
+        map_rewards = reward_table[cells]
+        map_rewards[walls] = np.nan
+        return cls(len(lines), width, walls=walls, start=cells == ord(START), goals=cells == ord(GOAL),
+                   terminals=cells == ord(TERMINAL), rewards=map_rewards, wind=wind)
+
+    @classmethod
+    def from_env(cls, env):
+        """ The map of a GridWorldV0-family environment. """
+        env = env.unwrapped
+        shape = (env.height, env.width)
+        wind = getattr(env, 'wind', None)
+        return cls(env.height, env.width, walls=env.illegal_mask.reshape(shape),
+                   start=np.asarray(env.isd, dtype=np.float64).reshape(shape),
+                   goals=env.goal_mask.reshape(shape), terminals=env.terminal_mask.reshape(shape),
+                   rewards=np.asarray(env.rewards, dtype=np.float64).reshape(shape), wind=wind)
+
+
+def classic_map(env_id):
+    """ The GridMap of a registered id, written out with GRIDWORLD, CLIFF and WINDY. MapGridWorldV0 compiles it
+        to the same model as the registered environment, which for WindyGridWorld-v0 also needs absorbing=True.
+    """
+    if env_id in ('GridWorld-v0', 'SlipperyGridWorld-v0'):
+        return GridMap.from_ascii(GRIDWORLD, rewards={GOAL: 1.0, TERMINAL: -1.0}, default_reward=-0.04)
+    if env_id in ('CliffGridWorld-v0', 'SlipperyCliffGridWorld-v0'):
+        return GridMap.from_ascii(CLIFF, rewards={TERMINAL: -100.0}, default_reward=-1.0)
+    if env_id == 'WindyGridWorld-v0':
+        return GridMap.from_ascii(WINDY, wind=[0, 0, 0, 1, 1, 1, 2, 2, 1, 0], default_reward=-1.0)
+    raise ValueError('no classic map for {}'.format(env_id))
+
+
+class MapGridWorldV0(GridWorldV0):
+    """ A GridWorldV0 whose layout, rewards and wind come from a GridMap, by default the classic 4x3 grid world.
+        The whole model is compiled with array operations over all cells. Wind pushes an agent leaving a cell
+        that many rows up after it moves, as in WindyGridWorldV0. With absorbing=True, every outcome of a goal
+        or terminal cell keeps the agent there with zero probability, as in WindyGridWorldV0; otherwise moves
+        out of them are as from any other cell, as in GridWorldV0.
+    """
+
+    def __init__(self, grid_map=None, slippery=False, absorbing=False, compact=False, block_size=None):
+        self.grid_map = classic_map('GridWorld-v0') if grid_map is None else grid_map
+        self.absorbing = absorbing
+        super(MapGridWorldV0, self).__init__(self.grid_map.width, self.grid_map.height, slippery=slippery,
+                                             compact=compact, block_size=block_size)
+
+    def load_map(self, grid_map):
+        """ Switches to another map of the same size, keeping the random number generator, e.g. to play a new
+            level every episode. Takes effect from the next reset. """
+        if (grid_map.height, grid_map.width) != (self.height, self.width):
+            raise ValueError('the map is {}x{}, expected {}x{}'.format(grid_map.height, grid_map.width,
+                                                                       self.height, self.width))
+        self.grid_map = grid_map
+        self.isd = self._generate_isd(self.num_states)
+        self.goal_mask, self.terminal_mask, self.illegal_mask = self._generate_masks()
+        self.layout_version += 1
+        self._transitions = None
+        self._invalidate_model()
+        self.rewards = self._generate_rewards()
+        self.rasterizer = None
+        self.close()
+
+    def _generate_isd(self, num_states):
+        start = self.grid_map.start.reshape(-1)
+        return start / start.sum()
+
+    def _generate_masks(self):
+        return [self.grid_map.goals.reshape(-1), self.grid_map.terminals.reshape(-1),
+                self.grid_map.walls.reshape(-1)]
+
+    def _generate_rewards(self):
+        rewards = self.grid_map.rewards.reshape(-1).copy()
+        rewards[self.illegal_mask] = None
+        return rewards
+
+    def _layout_key(self):
+        wind = None if self.grid_map.wind is None else hashlib.sha1(self.grid_map.wind.tobytes()).hexdigest()
+        return super(MapGridWorldV0, self)._layout_key() + (self.absorbing, wind)
+
+    def _max_push(self):
+        return 0 if self.grid_map.wind is None else int(self.grid_map.wind.max())
+
+    def _move(self, row, col, action):
+        new_row, new_col = super(MapGridWorldV0, self)._move(row, col, action)
+        if self.grid_map.wind is not None:
+            new_row = np.maximum(new_row - self.grid_map.wind[row, col], 0)
+        return new_row, new_col
+
+    def _generate_outcomes(self, states=None):
+        if states is None:
+            states = np.arange(self.num_states, dtype=np.int32)
+        next_states, probs, dones = super(MapGridWorldV0, self)._generate_outcomes(states)
+        if self.absorbing:
+            # every outcome of a goal or terminal cell stays there with zero probability, as in WindyGridWorldV0
+            done = self._ends_episode(states)
+            shape = (len(states), -1)
+            next_states.reshape(shape)[done] = states[done, None]
+            dones.reshape(shape)[done] = True
+            probs.reshape(shape)[done] = 0.0
+        return next_states, probs, dones
@@ -0,0 +1,183 @@
+""" Random grid world levels, generated and validated in batches as [num_levels, height, width] arrays.
+
+    Every kind of level has a single start and a single goal cell:
+    'maze'    binary tree mazes, with cells on even rows and columns and the walls between them carved open
+              towards the north or the east, from the top left to the bottom right cell; odd sizes leave no
+              row or column of walls along the bottom and right edges
+    'walls'   walls placed at random with probability wall_density, between random start and goal cells
+    'cliffs'  terminal cliff cells placed at random with probability cliff_density, with a reward of
+              cliff_reward, between the bottom left and bottom right corners as in CliffGridWorldV0
+    'wind'    a random wind in each column, from 0 to max_wind, between random start and goal cells
+    Entering any other cell costs step_reward and the goal gives goal_reward.
+"""
+import numpy as np
+from gym.utils import seeding
+
+from gridworldsgym.envs.distances import UNREACHABLE, DistanceField, goal_distances
+from gridworldsgym.envs.grid_map import GridMap
+from gridworldsgym.envs.gridworld import UP, RIGHT, DOWN, LEFT
+
+KINDS = ('maze', 'walls', 'cliffs', 'wind')
+
+
+def _one_hot_cells(num_levels, height, width, rows, cols):
+    cells = np.zeros((num_levels, height, width), dtype=bool)
+    cells[np.arange(num_levels), rows, cols] = True
+    return cells
+
+
+def _random_free_cells(np_random, blocked):
+    """ A random cell of every level that is not blocked, as (rows, cols); (0, 0) if all are. """
+    num_levels, height, width = blocked.shape
+    keys = np_random.rand(num_levels, height * width)
+    keys[blocked.reshape(num_levels, -1)] = -1
+    return np.divmod(keys.argmax(axis=1), width)
+
+
+def _mazes(np_random, num_levels, height, width):
+    walls = np.ones((num_levels, height, width), dtype=bool)
+    walls[:, ::2, ::2] = False
+    cell_rows, cell_cols = (height + 1) // 2, (width + 1) // 2
+    north = np_random.rand(num_levels, cell_rows, cell_cols) < 0.5
+    north[:, :, cell_cols - 1] = True
+    north[:, 0, :] = False
+    east = ~north
+    east[:, 0, cell_cols - 1] = False
+    # the wall north of cell (i, j) is at (2i - 1, 2j), the one east of it at (2i, 2j + 1)
+    level, i, j = np.nonzero(north)
+    walls[level, 2 * i - 1, 2 * j] = False
+    level, i, j = np.nonzero(east)
+    walls[level, 2 * i, 2 * j + 1] = False
+    start = _one_hot_cells(num_levels, height, width, 0, 0)
+    goals = _one_hot_cells(num_levels, height, width, 2 * (cell_rows - 1), 2 * (cell_cols - 1))
+    return walls, start, goals
+
+
+def generate(kind, num_levels, height, width, np_random, wall_density=0.25, cliff_density=0.15, max_wind=2,
+             step_reward=-1.0, goal_reward=0.0, cliff_reward=-100.0):
+    """ A batch of levels as a dict of [num_levels, height, width] walls, start, goals, terminals, rewards and,
+        for 'wind' levels, wind arrays. The levels are not validated, see solvable. """
+    if kind not in KINDS:
+        raise ValueError('kind must be one of {}, got {!r}'.format(KINDS, kind))
+    shape = (num_levels, height, width)
+    walls = np.zeros(shape, dtype=bool)
+    terminals = np.zeros(shape, dtype=bool)
+    wind = None
+    if kind == 'maze':
+        walls, start, goals = _mazes(np_random, num_levels, height, width)
+    elif kind == 'cliffs':
+        start = _one_hot_cells(num_levels, height, width, height - 1, 0)
+        goals = _one_hot_cells(num_levels, height, width, height - 1, width - 1)
+        terminals = (np_random.rand(*shape) < cliff_density) & ~start & ~goals
+    else:
+        if kind == 'walls':
+            walls = np_random.rand(*shape) < wall_density
+        else:
+            wind = np.broadcast_to(np_random.randint(max_wind + 1, size=(num_levels, 1, width)), shape)
+        start = _one_hot_cells(num_levels, height, width, *_random_free_cells(np_random, walls))
+        goals = _one_hot_cells(num_levels, height, width, *_random_free_cells(np_random, walls | start))
+        walls &= ~(start | goals)
+    rewards = np.full(shape, step_reward)
+    rewards[goals] = goal_reward
+    rewards[terminals] = cliff_reward
+    rewards[walls] = np.nan
+    return {'walls': walls, 'start': start.astype(np.float64), 'goals': goals, 'terminals': terminals,
+            'rewards': rewards, 'wind': wind}
+
+
+def next_state_table(walls, wind=None):
+    """ The state every action leads to in every level, without slipping, as [num_levels, num_states,
+        num_actions] states of that level. Same rule as MapGridWorldV0: move, be pushed up by the wind of the
+        cell left, and stay put if that is a wall. """
+    num_levels, height, width = walls.shape
+    rows, cols = np.divmod(np.arange(height * width), width)
+    table = np.empty((num_levels, height * width, 4), dtype=np.int64)
+    flat_walls = walls.reshape(num_levels, -1)
+    for action in [UP, RIGHT, DOWN, LEFT]:
+        new_rows, new_cols = rows, cols
+        if action == LEFT:
+            new_cols = np.maximum(cols - 1, 0)
+        elif action == DOWN:
+            new_rows = np.minimum(rows + 1, height - 1)
+        elif action == RIGHT:
+            new_cols = np.minimum(cols + 1, width - 1)
+        elif action == UP:
+            new_rows = np.maximum(rows - 1, 0)
+        if wind is None:
+            new_states = np.broadcast_to(new_rows * width + new_cols, (num_levels, height * width))
+        else:
+            pushed_rows = np.maximum(new_rows - wind.reshape(num_levels, -1), 0)
+            new_states = pushed_rows * width + new_cols
+        blocked = np.take_along_axis(flat_walls, new_states, axis=1)
+        table[:, :, action] = np.where(blocked, rows * width + cols, new_states)
+    return table
+
+
+def level_distances(walls, goals, terminals, wind=None):
+    """ The DistanceField of every level at once, as [num_levels, height, width] distances and actions; see
+        gridworldsgym.envs.distances. Slipping only adds moves, so slippery levels are no further. """
+    num_levels, height, width = walls.shape
+    num_states = height * width
+    offsets = (np.arange(num_levels) * num_states)[:, None, None]
+    successors = (next_state_table(walls, wind) + offsets).reshape(-1, 4)
+    goals = goals.reshape(-1)
+    field = goal_distances(successors, goals, goals | terminals.reshape(-1) | walls.reshape(-1))
+    return DistanceField(*[array.reshape(walls.shape) for array in field])
+
+
+def can_reach_goal(walls, goals, terminals, wind=None):
+    """ Whether a goal can be reached from each cell of each level, as [num_levels, height, width]. """
+    return level_distances(walls, goals, terminals, wind).distances != UNREACHABLE
+
+
+def solvable(walls, start, goals, terminals, wind=None):
+    """ Whether a goal can be reached from every start cell of each level, see can_reach_goal. """
+    stranded = (np.asarray(start) > 0) & ~can_reach_goal(walls, goals, terminals, wind)
+    return ~stranded.reshape(len(walls), -1).any(axis=1)
+
+
+class LevelGenerator(object):
+    """ Generates solvable levels of a kind in batches of batch_size, dropping those that fail validation, and
+        hands them out one GridMap at a time, e.g. to load a new level into a MapGridWorldV0 every episode.
+        options are passed to generate.
+    """
+
+    def __init__(self, height, width, kind='maze', batch_size=256, seed=None, **options):
+        self.height = height
+        self.width = width
+        self.kind = kind
+        self.batch_size = batch_size
+        self.options = options
+        self.np_random = None
+        self.seed(seed)
+        self._levels = []
+
+    def seed(self, seed=None):
+        self.np_random, seed = seeding.np_random(seed)
+        return [seed]
+
+    def generate_batch(self):
+        """ The solvable levels of one batch of batch_size, as GridMaps. """
+        levels = generate(self.kind, self.batch_size, self.height, self.width, self.np_random, **self.options)
+        valid = solvable(levels['walls'], levels['start'], levels['goals'], levels['terminals'], levels['wind'])
+        maps = []
+        for i in np.flatnonzero(valid):
+            wind = None if levels['wind'] is None else levels['wind'][i]
+            maps.append(GridMap(self.height, self.width, walls=levels['walls'][i], start=levels['start'][i],
+                                goals=levels['goals'][i], terminals=levels['terminals'][i],
+                                rewards=levels['rewards'][i], wind=wind))
+        return maps
+
+    def sample(self, num_levels):
+        maps = []
+        while len(maps) < num_levels:
+            maps.append(next(self))
+        return maps
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        while not self._levels:
+            self._levels = self.generate_batch()[::-1]
+        return self._levels.pop()
@@ -0,0 +1,201 @@
+import numpy as np
+
+from gridworldsgym.util import kernels
+
+# the indptr passed to kernels for models of uniform rows, which do not read it
+_NO_INDPTR = np.zeros(0, dtype=np.int64)
+
+
+class TransitionModel(object):
+    """ Flat, compiled form of the transition and reward functions of a finite MDP.
+        The outcomes of every (state, action) pair are stored contiguously, CSR style, in rows indexed by
+        state * num_actions + action, so that the outcomes of row sa are indptr[sa]:indptr[sa + 1] of the
+        next_states, probs, dones and rewards arrays. rewards holds R(next_state, action) for each outcome
+        and cdf the cumulative probabilities within each row, which is all that is needed to sample a step.
+        Next states are int32 and dones bool; probs, cdf and rewards share the float dtype the model was
+        built with, float64 unless a compact float32 model was requested.
+        Models whose rows all hold row_length outcomes may be given indptr=None: row sa is then
+        sa * row_length:(sa + 1) * row_length, and indptr is only built if something asks for it.
+    """
+
+    ARRAYS = ('indptr', 'next_states', 'probs', 'dones', 'rewards', 'cdf')
+
+    def __init__(self, num_states, num_actions, indptr, next_states, probs, dones, rewards, cdf=None,
+                 row_length=None):
+        self.num_states = num_states
+        self.num_actions = num_actions
+        self._indptr = indptr
+        self.next_states = next_states
+        self.probs = probs
+        self.dones = dones
+        self.rewards = rewards
+        if indptr is None:
+            lengths = None
+            self.max_outcomes = row_length
+            self.uniform_rows = True
+        else:
+            lengths = np.diff(indptr)
+            self.max_outcomes = int(lengths.max()) if len(lengths) else 0
+            self.uniform_rows = bool(len(lengths) == 0 or lengths.min() == self.max_outcomes)
+        # the length of every row, or None if rows differ in length
+        self.row_length = self.max_outcomes if self.uniform_rows else None
+        if cdf is None:
+            cdf = self._cumulative(indptr, probs, lengths, self.row_length)
+        self.cdf = cdf
+        self._predecessor_index = None
+
+    @property
+    def indptr(self):
+        """ The start of every row and the end of the last, built on first use if the model was given none. """
+        if self._indptr is None:
+            num_rows = self.num_states * self.num_actions
+            self._indptr = np.arange(num_rows + 1, dtype=np.int64) * self.row_length
+            self._indptr.flags.writeable = False
+        return self._indptr
+
+    def _kernel_args(self):
+        # kernels find row bounds from row_length when it is positive, and from indptr otherwise
+        if self.row_length:
+            return _NO_INDPTR, self.row_length
+        return self.indptr, 0
+
+    @classmethod
+    def from_functions(cls, num_states, num_actions, P, R, dtype=np.float64):
+        num_rows = num_states * num_actions
+        lengths = np.zeros(num_rows, dtype=np.int64)
+        next_states, probs, dones, rewards = [], [], [], []
+        for state in range(num_states):
+            for action in range(num_actions):
+                outcomes = P(state, action)
+                lengths[state * num_actions + action] = len(outcomes)
+                for prob, next_state, done in outcomes:
+                    probs.append(prob)
+                    next_states.append(next_state)
+                    dones.append(done)
+                    rewards.append(R(next_state, action))
+        indptr = np.zeros(num_rows + 1, dtype=np.int64)
+        np.cumsum(lengths, out=indptr[1:])
+        return cls(num_states, num_actions, indptr,
+                   np.asarray(next_states, dtype=np.int32),
+                   np.asarray(probs, dtype=dtype),
+                   np.asarray(dones, dtype=bool),
+                   np.asarray(rewards, dtype=dtype))
+
+    @classmethod
+    def from_arrays(cls, num_states, num_actions, arrays):
+        """ Wraps the arrays named in ARRAYS, e.g. views of shared or memory-mapped buffers, without copying.
+            Without indptr, every row holds the same number of outcomes. """
+        if 'indptr' in arrays:
+            return cls(num_states, num_actions, *[arrays[name] for name in cls.ARRAYS])
+        row_length = len(arrays['next_states']) // max(num_states * num_actions, 1)
+        return cls(num_states, num_actions, None, *[arrays[name] for name in cls.ARRAYS[1:]], row_length=row_length)
+
+    def to_arrays(self):
+        """ The arrays of ARRAYS that the model holds, which leaves out an indptr that was never built. """
+        return {name: getattr(self, name) for name in self.ARRAYS if name != 'indptr' or self._indptr is not None}
+
+    def with_rewards(self, rewards):
+        """ A model that shares every array with this one except rewards. """
+        model = TransitionModel(self.num_states, self.num_actions, self._indptr, self.next_states, self.probs,
+                                self.dones, rewards, cdf=self.cdf, row_length=self.row_length)
+        model._predecessor_index = self._predecessor_index
+        return model
+
+    def copy(self):
+        """ A model with its own copy of every array, which can be modified without affecting this one. """
+        arrays = {name: array.copy() for name, array in self.to_arrays().items()}
+        return TransitionModel.from_arrays(self.num_states, self.num_actions, arrays)
+
+    def predecessor_index(self):
+        """ The reverse of the model, CSR style: returns (indptr, rows) where rows[indptr[s]:indptr[s + 1]] are
+            the rows, state * num_actions + action, with an outcome of positive probability entering state s,
+            in increasing order and without repeats. Built on first use and shared with with_rewards models.
+        """
+        if self._predecessor_index is None:
+            num_rows = self.num_states * self.num_actions
+            rows = np.repeat(np.arange(num_rows, dtype=np.int64), self.row_length or np.diff(self.indptr))
+            keys = np.unique((self.next_states.astype(np.int64) * num_rows + rows)[self.probs > 0])
+            states, rows = np.divmod(keys, num_rows)
+            indptr = np.zeros(self.num_states + 1, dtype=np.int64)
+            np.cumsum(np.bincount(states, minlength=self.num_states), out=indptr[1:])
+            self._predecessor_index = (indptr, rows)
+        return self._predecessor_index
+
+    def predecessors(self, state):
+        """ The (states, actions) arrays of the pairs that can lead into state, see predecessor_index. """
+        indptr, rows = self.predecessor_index()
+        return np.divmod(rows[indptr[state]:indptr[state + 1]], self.num_actions)
+
+    @staticmethod
+    def _cumulative(indptr, probs, lengths, row_length=None):
+        # Rows are summed in groups of equal length so that every row is accumulated left to right exactly
+        # like np.cumsum over that row alone, which keeps sampling bit-for-bit identical to doing it per step.
+        # row_length is given when every row has that length. Rows of one outcome are their own cdf, so the
+        # model shares one array between probs and cdf, which anything that writes one must write to both.
+        if row_length == 1:
+            return probs
+        if row_length:
+            return np.cumsum(probs.reshape(-1, row_length), axis=1).reshape(-1)
+        cdf = np.empty_like(probs)
+        for length in np.unique(lengths):
+            if length == 0:
+                continue
+            index = indptr[:-1][lengths == length, None] + np.arange(length)
+            cdf[index] = np.cumsum(probs[index], axis=1)
+        return cdf
+
+    def row(self, state, action):
+        return state * self.num_actions + action
+
+    def row_bounds(self, sa):
+        """ The (start, stop) of the outcomes of row sa. """
+        if self.row_length is not None:
+            return sa * self.row_length, (sa + 1) * self.row_length
+        return self.indptr[sa], self.indptr[sa + 1]
+
+    def outcomes(self, state, action):
+        start, stop = self.row_bounds(self.row(state, action))
+        return [(float(self.probs[i]), int(self.next_states[i]), bool(self.dones[i])) for i in range(start, stop)]
+
+    def to_transitions(self):
+        """ The model as the dict of dicts of (prob, next_state, done) lists used by GridWorldV0.transitions. """
+        return {s: {a: self.outcomes(s, a) for a in range(self.num_actions)} for s in range(self.num_states)}
+
+    def sample(self, state, action, u):
+        """ Returns the index of the outcome of taking action in state given a uniform draw u. Same rule as
+            FiniteStateMDP._sample: the first outcome whose cumulative probability exceeds u, else the first.
+        """
+        sa = state * self.num_actions + action
+        if kernels.compiled is not None:
+            # NumPy compares an array with a scalar in the array's dtype, and so does the kernel
+            return kernels.compiled.sample(*self._kernel_args(), self.cdf, sa, self.cdf.dtype.type(u))
+        start, stop = self.row_bounds(sa)
+        if stop - start == 1:
+            return start
+        return start + (self.cdf[start:stop] > u).argmax()
+
+    def sample_batch(self, states, actions, u):
+        """ Vectorized sample: the outcome indices for arrays of states, actions and uniform draws u. """
+        return self.sample_rows(states * self.num_actions + actions, u)
+
+    def sample_rows(self, rows, u):
+        """ sample_batch for rows given as state * num_actions + action. """
+        if kernels.compiled is not None:
+            return kernels.compiled.sample_rows(*self._kernel_args(), self.cdf, np.asarray(rows), np.asarray(u),
+                                                np.empty(len(rows), dtype=np.int64))
+        start = rows * self.row_length if self.row_length is not None else self.indptr[rows]
+        if self.max_outcomes == 1:
+            return start
+        # cdf rows never decrease, so the first outcome whose cumulative probability exceeds u is the one after
+        # all those that do not; gathering one column at a time is much faster than a 2-d gather and argmax.
+        below = np.zeros(len(rows), dtype=np.int64)
+        if self.uniform_rows:
+            for offset in range(self.max_outcomes):
+                below += self.cdf[start + offset] <= u
+            below[below == self.max_outcomes] = 0
+        else:
+            last = self.indptr[rows + 1] - 1
+            for offset in range(self.max_outcomes):
+                below += (self.cdf[np.minimum(start + offset, last)] <= u) & (start + offset <= last)
+            below[below == last - start + 1] = 0
+        return start + below
@@ -0,0 +1,107 @@
+import numpy as np
+from gym import spaces
+
+MODES = ('one_hot', 'coordinates', 'normalized', 'egocentric')
+
+# channels of an egocentric view
+WALL, GOAL, TERMINAL = 0, 1, 2
+
+# one-hot tables are num_states by num_states, so larger grids scatter into the output instead
+MAX_ONE_HOT_TABLE_STATES = 4096
+
+
+def coordinate_table(env, dtype=np.float32):
+    """ The (row, col) of every state. """
+    rows, cols = np.divmod(np.arange(env.num_states), env.width)
+    return np.stack([rows, cols], axis=1).astype(dtype)
+
+
+def normalized_table(env, dtype=np.float32):
+    """ The (row, col) of every state scaled to [0, 1]. """
+    scale = np.array([max(env.height - 1, 1), max(env.width - 1, 1)], dtype=np.float64)
+    return (coordinate_table(env, np.float64) / scale).astype(dtype)
+
+
+def egocentric_table(env, view_size=3, dtype=np.float32):
+    """ The view_size by view_size cells centred on every state, as [num_states, view_size, view_size, 3] with
+        WALL, GOAL and TERMINAL channels. Illegal cells and cells off the grid are walls. """
+    if view_size % 2 != 1:
+        raise ValueError('view_size must be odd, got {}'.format(view_size))
+    radius = view_size // 2
+    grid = np.zeros((env.height + 2 * radius, env.width + 2 * radius, 3), dtype=dtype)
+    grid[:, :, WALL] = 1
+    grid[radius:radius + env.height, radius:radius + env.width, WALL] = 0
+    for channel, cells in [(WALL, env.illegal_states), (GOAL, env.goal_states), (TERMINAL, env.terminal_states)]:
+        for row, col in cells:
+            grid[row + radius, col + radius, channel] = 1
+    rows, cols = np.divmod(np.arange(env.num_states), env.width)
+    offsets = np.arange(view_size)
+    return grid[(rows[:, None] + offsets)[:, :, None], (cols[:, None] + offsets)[:, None, :]]
+
+
+class ObservationEncoder(object):
+    """ Encodes the states of a GridWorldV0-family environment as one_hot vectors, (row, col) coordinates,
+        coordinates normalized to [0, 1] or egocentric view_size by view_size views of walls, goals and
+        terminals. Encodings are read-only tables indexed by state, built once, so encoding a batch of states
+        is a single gather into out. One-hot encodings of more than MAX_ONE_HOT_TABLE_STATES states are
+        scattered into out instead of being looked up. Egocentric views follow edits of the layout, e.g.
+        add_wall or load_map: their table is built again on the first encoding after the layout changes.
+    """
+
+    def __init__(self, env, mode='one_hot', view_size=3, dtype=np.float32):
+        if mode not in MODES:
+            raise ValueError('mode must be one of {}, got {!r}'.format(MODES, mode))
+        env = env.unwrapped
+        self.mode = mode
+        self.view_size = view_size
+        self.num_states = env.num_states
+        self.dtype = np.dtype(dtype)
+        if mode == 'one_hot':
+            table = np.eye(env.num_states, dtype=dtype) if env.num_states <= MAX_ONE_HOT_TABLE_STATES else None
+            self.shape = (env.num_states,)
+            low, high = 0, 1
+        elif mode == 'coordinates':
+            table = coordinate_table(env, dtype)
+            low, high = 0, [env.height - 1, env.width - 1]
+        elif mode == 'normalized':
+            table = normalized_table(env, dtype)
+            low, high = 0, 1
+        else:
+            table = egocentric_table(env, view_size, dtype)
+            low, high = 0, 1
+        if table is not None:
+            table.flags.writeable = False
+            self.shape = table.shape[1:]
+        self.table = table
+        # only egocentric views depend on the layout, so only they keep the env to notice its edits
+        self._env = env if mode == 'egocentric' else None
+        self._layout_version = env.layout_version
+        self.observation_space = spaces.Box(low=np.full(self.shape, low, dtype=self.dtype),
+                                            high=np.full(self.shape, high, dtype=self.dtype), dtype=self.dtype)
+
+    def encode(self, states, out=None):
+        """ Encodings of an array of states, written to out, an [len(states)] + shape array, if given. """
+        states = np.asarray(states)
+        if self._env is not None and self._env.layout_version != self._layout_version:
+            self._rebuild()
+        if self.table is not None:
+            return np.take(self.table, states, axis=0, out=out)
+        if out is None:
+            out = np.zeros(states.shape + self.shape, dtype=self.dtype)
+        else:
+            out.fill(0)
+        out.reshape(-1, self.num_states)[np.arange(states.size), states.reshape(-1)] = 1
+        return out
+
+    def encode_state(self, state):
+        """ The encoding of a single state; a read-only row of the table, so nothing is copied. """
+        if self._env is not None and self._env.layout_version != self._layout_version:
+            self._rebuild()
+        if self.table is not None:
+            return self.table[state]
+        return self.encode(np.array([state]))[0]
+
+    def _rebuild(self):
+        self.table = egocentric_table(self._env, self.view_size, self.dtype)
+        self.table.flags.writeable = False
+        self._layout_version = self._env.layout_version
@@ -0,0 +1,92 @@
+import gym
+import numpy as np
+from gym.utils import seeding
+from gym.vector import VectorEnv
+
+from gridworldsgym.envs.gridworld import HEADINGS
+from gridworldsgym.util import seeding as streams
+
+
+class GridWorldVectorEnv(VectorEnv):
+    """ Steps num_envs copies of a FiniteStateMDP in lockstep with a single vectorized pass over its compiled
+        TransitionModel. env is either a registered id, e.g. 'SlipperyCliffGridWorld-v0', which is made with
+        the given kwargs, or an existing environment whose model is shared by all copies.
+        Copies that finish an episode are reset from isd straight away, as gym's vector environments do, and
+        the state they ended in is reported in infos['terminal_state']. infos is a single dict of arrays
+        rather than a list of per-environment dicts. model replaces env.model, which is then never built.
+        With a block_size, copy i draws from its own stream, child first_stream + i of the seed's
+        SeedSequence, block_size uniforms at a time. A copy's trajectory then only depends on the seed and
+        its index, whatever block_size is and however the copies are split between vector environments, and
+        it is the trajectory of a single environment made with a block_size and seeded with that child.
+    """
+
+    def __init__(self, env, num_envs, model=None, block_size=None, first_stream=0, **kwargs):
+        if isinstance(env, str):
+            env = gym.make(env, **kwargs)
+        self.env = env.unwrapped
+        super(GridWorldVectorEnv, self).__init__(num_envs, self.env.observation_space, self.env.action_space)
+        self.model = self.env.model if model is None else model
+        self.isd_cdf = np.cumsum(np.asarray(self.env.isd, dtype=np.float64))
+        self.np_random = None
+        self.block_size = block_size
+        self.first_stream = first_stream
+        self.uniforms = None
+        self.seed()
+        self.states = np.zeros(num_envs, dtype=np.int64)
+        self.last_actions = np.zeros(num_envs, dtype=np.int64)
+        self.rasterizer = None
+        self._actions = None
+
+    def seed(self, seed=None):
+        if self.block_size is None:
+            self.np_random, seed = seeding.np_random(seed)
+            return [seed]
+        sequence = streams.seed_sequence(seed)
+        children = streams.spawn(sequence, self.first_stream, self.first_stream + self.num_envs)
+        generators = [streams.np_random(child)[0] for child in children]
+        self.uniforms = streams.UniformBlocks(generators, self.block_size)
+        return [sequence.entropy]
+
+    def reset_wait(self, **kwargs):
+        self.states = self._sample_isd()
+        return self.states
+
+    def step_async(self, actions):
+        self._actions = np.asarray(actions, dtype=np.int64)
+
+    def step_wait(self, **kwargs):
+        model = self.model
+        index = model.sample_batch(self.states, self._actions, self._uniform())
+        next_states = model.next_states[index]
+        dones = model.dones[index]
+        states = next_states.astype(np.int64)
+        if dones.any():
+            states[dones] = self._sample_isd(np.flatnonzero(dones))
+        self.states = states
+        self.last_actions = self._actions
+        return states, model.rewards[index], dones, {'prob': model.probs[index], 'terminal_state': next_states}
+
+    def render(self, mode='rgb_array', out=None):
+        """ Frames of all copies as one [num_envs, height, width, 3] array, drawn by the NumPy rasterizer of
+            GridWorldV0. Like GridWorldV0, a copy keeps facing the way it last moved across a reset. """
+        if mode != 'rgb_array':
+            raise NotImplementedError("GridWorldVectorEnv only renders mode='rgb_array'")
+        if self.rasterizer is None:
+            from gridworldsgym.util.raster import GridRasterizer
+            self.rasterizer = GridRasterizer(self.env)
+        return self.rasterizer.render_batch(self.states, np.asarray(HEADINGS)[self.last_actions], out=out)
+
+    def close_extras(self, **kwargs):
+        pass
+
+    def _uniform(self, envs=None):
+        """ The next uniform of each of the copies envs, or of all copies. """
+        if self.uniforms is not None:
+            return self.uniforms.take(envs)
+        return self.np_random.rand(self.num_envs if envs is None else len(envs))
+
+    def _sample_isd(self, envs=None):
+        # Same rule as FiniteStateMDP._sample: the first state whose cumulative probability exceeds the draw.
+        states = np.searchsorted(self.isd_cdf, self._uniform(envs), side='right')
+        states[states == len(self.isd_cdf)] = 0
+        return states
@@ -6,47 +6,55 @@ from gridworldsgym.envs.gridworld import UP, RIGHT, DOWN, LEFT
 
 class WindyGridWorldV0(GridWorldV0):
     # TODO: Add doc string
-    def __init__(self, width=10, height=7):
+    def __init__(self, width=10, height=7, compact=False, block_size=None):
         self.wind = [0, 0, 0, 1, 1, 1, 2, 2, 1, 0]
-        super(WindyGridWorldV0, self).__init__(width, height)
-        self.isd = np.zeros(self.num_states)
-        self.isd[30] = 1.0
-        self.goal_states = [(3, 7)]
-        self.terminal_states = []
-        self.illegal_states = []
-        self.transitions = self._generate_transitions()
-        self.rewards = self._generate_rewards()
+        if width > len(self.wind):
+            raise ValueError('WindyGridWorldV0 has wind for at most {} columns, got width={}'.format(len(self.wind),
+                                                                                                  width))
+        super(WindyGridWorldV0, self).__init__(width, height, compact=compact, block_size=block_size)
+
+    def _generate_isd(self, num_states):
+        isd = np.zeros(num_states)
+        isd[30] = 1.0
+        return isd
+
+    def _generate_layout(self):
+        return [(3, 7)], [], []
+
+    def _layout_key(self):
+        return super(WindyGridWorldV0, self)._layout_key() + (self.wind,)
+
+    def _max_push(self):
+        return max(self.wind)
 
     def _move(self, row, col, action):
-        wind = self.wind[col]
+        wind = np.asarray(self.wind)[col]
         if action == LEFT:
-            col = max(col - 1, 0)
+            col = np.maximum(col - 1, 0)
         elif action == DOWN:
-            row = min(row + 1, self.height - 1)
+            row = np.minimum(row + 1, self.height - 1)
         elif action == RIGHT:
-            col = min(col + 1, self.width - 1)
+            col = np.minimum(col + 1, self.width - 1)
         elif action == UP:
-            row = max(row - 1, 0)
-        row = max(row - wind, 0)
+            row = np.maximum(row - 1, 0)
+        row = np.maximum(row - wind, 0)
         return row, col
 
-    def _generate_transitions(self):
-        transitions = {s: {a: [] for a in range(self.num_actions)} for s in range(self.num_states)}
-        for row in range(self.height):
-            for col in range(self.width):
-                state = self._to_state(row, col)
-                for action in range(self.num_actions):
-                    if (row, col) in self.terminal_states or (row, col) in self.goal_states:
-                        transitions[state][action].append((0.0, state, True))
-                    else:
-                        action_probs = [1.0]
-                        actions = [action]
-                        for i in range(len(actions)):
-                            new_row, new_col = self._move(row, col, actions[i])
-                            new_state = self._to_state(new_row, new_col)
-                            done = (new_row, new_col) in self.terminal_states or (new_row, new_col) in self.goal_states
-                            transitions[state][action].append((action_probs[i], new_state, done))
-        return transitions
+    def _generate_outcomes(self, states=None):
+        if states is None:
+            states = np.arange(self.num_states, dtype=np.int32)
+        rows, cols = self.to_row_col(states)
+        done = self._ends_episode(states)
+        next_states = np.empty((len(states), self.num_actions), dtype=np.int32)
+        dones = np.empty((len(states), self.num_actions), dtype=bool)
+        for action in range(self.num_actions):
+            new_states = self._to_state(*self._move(rows, cols, action))
+            new_states = np.where(self.illegal_mask[new_states], states, new_states)
+            # terminal and goal cells are absorbing, with a single zero probability self transition
+            next_states[:, action] = np.where(done, states, new_states)
+            dones[:, action] = done | self._ends_episode(new_states)
+        probs = np.repeat(np.where(done, 0.0, 1.0).astype(self._float_dtype), self.num_actions)
+        return next_states.ravel(), probs, dones.ravel()
 
     def _generate_rewards(self):
         rewards = -1.0 * np.ones(self.num_states)
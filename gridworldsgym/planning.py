@@ -0,0 +1,249 @@
+""" Dynamic programming solvers for the compiled TransitionModel of any FiniteStateMDP.
+
+    Every solver takes either an environment or its model. By default they run directly on the model's CSR
+    arrays; with dense=True they use a dense num_states * num_actions by num_states matrix instead, which is
+    faster for small grids. Outcomes flagged done end the episode, so they contribute their reward but no
+    future value.
+"""
+import heapq
+from collections import namedtuple
+
+import numpy as np
+
+PlanningResult = namedtuple('PlanningResult', ['values', 'policy', 'q_values', 'iterations', 'converged', 'error'])
+
+
+class ModelMatrix(object):
+    """ The model as a num_states * num_actions by num_states sparse matrix of continuation probabilities,
+        stored in the model's own CSR arrays, and the vector of expected immediate rewards. """
+
+    def __init__(self, indptr, indices, data, num_columns):
+        self.indptr = indptr
+        self.indices = indices
+        self.data = data
+        self.shape = (len(indptr) - 1, num_columns)
+        lengths = np.diff(indptr)
+        self._width = int(lengths[0]) if len(lengths) and np.all(lengths == lengths[0]) else None
+        if self._width is None:
+            self._row_ids = np.repeat(np.arange(self.shape[0]), lengths)
+
+    def dot(self, v):
+        return self.sum_rows(self.data * v[self.indices])
+
+    def sum_rows(self, values):
+        """ Sums values, given for every stored entry, within each row. """
+        if self._width is not None:
+            return values.reshape(self.shape[0], self._width).sum(axis=1)
+        return np.bincount(self._row_ids, weights=values, minlength=self.shape[0])
+
+    def __getitem__(self, rows):
+        starts = self.indptr[rows]
+        lengths = self.indptr[rows + 1] - starts
+        indptr = np.zeros(len(rows) + 1, dtype=np.int64)
+        np.cumsum(lengths, out=indptr[1:])
+        index = np.repeat(starts - indptr[:-1], lengths) + np.arange(indptr[-1])
+        return ModelMatrix(indptr, self.indices[index], self.data[index], self.shape[1])
+
+    def to_scipy(self):
+        try:
+            from scipy import sparse
+        except ImportError:
+            raise ImportError('''
+            Cannot import scipy, which is needed to solve sparse linear systems.
+            HINT: you can install it with 'pip install gridworldsgym[planning]' or 'pip install scipy', or pass
+            dense=True.
+            ''')
+        return sparse.csr_matrix((self.data, self.indices, self.indptr), shape=self.shape)
+
+
+def model_matrices(env, dense=False):
+    """ Returns (P, r), where P[s * num_actions + a, s'] is the probability of taking action a in state s and
+        continuing from s', and r[s * num_actions + a] the expected immediate reward. P is a ModelMatrix unless
+        dense, in which case it is an ndarray. The rows of an environment's illegal states, which can never be
+        entered, have no reward or continuation, so their value is 0 whatever their outcomes' rewards are. """
+    model = _get_model(env)
+    probs = model.probs.astype(np.float64)
+    usable = probs > 0
+    illegal = getattr(getattr(env, 'unwrapped', env), 'illegal_mask', None)
+    if illegal is not None and illegal.any():
+        # e.g. a wall on the border, whose moves into the border stay in the wall and enter its NaN reward
+        lengths = model.row_length if model.uniform_rows else np.diff(model.indptr)
+        usable &= ~np.repeat(np.repeat(illegal, model.num_actions), lengths)
+    weighted_rewards = np.where(usable, probs * model.rewards, 0.0)
+    continuation = np.where(model.dones | ~usable, 0.0, probs)
+    P = ModelMatrix(model.indptr, model.next_states, continuation, model.num_states)
+    r = P.sum_rows(weighted_rewards)
+    if dense:
+        rows = np.repeat(np.arange(P.shape[0]), np.diff(model.indptr))
+        dense_P = np.zeros(P.shape)
+        np.add.at(dense_P, (rows, model.next_states), continuation)
+        P = dense_P
+    return P, r
+
+
+def value_iteration(env, gamma=0.99, tol=1e-6, max_iterations=10000, dense=False):
+    """ Iterates the Bellman optimality backup until values change by less than tol, at most max_iterations
+        times. """
+    P, r = model_matrices(env, dense=dense)
+    num_states = P.shape[1]
+    values = np.zeros(num_states)
+    error = np.inf
+    q_values = r.reshape(num_states, -1)
+    iteration = 0
+    for iteration in range(1, max_iterations + 1):
+        q_values = (r + gamma * P.dot(values)).reshape(num_states, -1)
+        new_values = q_values.max(axis=1)
+        error = np.abs(new_values - values).max()
+        values = new_values
+        if error < tol:
+            break
+    return PlanningResult(values, q_values.argmax(axis=1), q_values, iteration, bool(error < tol), error)
+
+
+def policy_iteration(env, gamma=0.99, tol=1e-6, max_iterations=10000, evaluation_sweeps=20, dense=False):
+    """ Modified policy iteration: each iteration takes the greedy policy of the current values and applies
+        its Bellman backup evaluation_sweeps times. Stops once the greedy backup changes values by less than tol.
+        evaluation_sweeps=1 is value iteration; a large number approaches classic policy iteration. """
+    P, r = model_matrices(env, dense=dense)
+    num_states = P.shape[1]
+    num_actions = P.shape[0] // num_states
+    values = np.zeros(num_states)
+    error = np.inf
+    q_values = r.reshape(num_states, num_actions)
+    iteration = 0
+    for iteration in range(1, max_iterations + 1):
+        q_values = (r + gamma * P.dot(values)).reshape(num_states, num_actions)
+        policy = q_values.argmax(axis=1)
+        new_values = q_values.max(axis=1)
+        error = np.abs(new_values - values).max()
+        values = new_values
+        if error < tol:
+            break
+        rows = np.arange(num_states) * num_actions + policy
+        P_pi, r_pi = P[rows], r[rows]
+        for _ in range(evaluation_sweeps - 1):
+            values = r_pi + gamma * P_pi.dot(values)
+    return PlanningResult(values, q_values.argmax(axis=1), q_values, iteration, bool(error < tol), error)
+
+
+def prioritized_sweeping(env, gamma=0.99, tol=1e-6, max_backups=10000000):
+    """ Asynchronous value iteration that backs up one state at a time, always the one whose value would change
+        the most, kept in a heap. Once a state's value changes, only the states that can lead into it, found
+        with the model's predecessor_index, are backed up again and requeued. Stops when no state would change
+        by tol or more, or after max_backups; iterations counts the states backed up. Where rewards are sparse,
+        this takes far fewer backups than value iteration, which backs up every state each iteration.
+    """
+    model = _get_model(env)
+    P, r = model_matrices(env)
+    num_states, num_actions = model.num_states, model.num_actions
+    # the distinct states with an action that can lead into each state, predecessors[indptr[s]:indptr[s + 1]]
+    row_indptr, rows = model.predecessor_index()
+    states = rows // num_actions
+    targets = np.repeat(np.arange(num_states), np.diff(row_indptr))
+    keep = np.ones(len(states), dtype=bool)
+    keep[1:] = (states[1:] != states[:-1]) | (targets[1:] != targets[:-1])
+    predecessors = states[keep]
+    indptr = np.zeros(num_states + 1, dtype=np.int64)
+    np.cumsum(np.bincount(targets[keep], minlength=num_states), out=indptr[1:])
+
+    if model.uniform_rows:
+        # every state's outcomes as [num_actions, outcomes] blocks, so a backup is a few small gathers
+        shape = (num_states, num_actions, -1)
+        outcome_probs, outcome_states = P.data.reshape(shape), P.indices.reshape(shape)
+        state_rewards = r.reshape(num_states, num_actions)
+
+        def state_backups(states):
+            continuation = (outcome_probs[states] * values[outcome_states[states]]).sum(axis=2)
+            return (state_rewards[states] + gamma * continuation).max(axis=1)
+    else:
+        def state_backups(states):
+            rows = (states[:, None] * num_actions + np.arange(num_actions)).reshape(-1)
+            return (r[rows] + gamma * P[rows].dot(values)).reshape(len(states), num_actions).max(axis=1)
+
+    values = np.zeros(num_states)
+    backups = state_backups(np.arange(num_states))
+    # priorities are kept in a list, as they are read and written one state at a time
+    priorities = [priority if priority >= tol else 0.0 for priority in np.abs(backups - values).tolist()]
+    heap = [(-priority, state) for state, priority in enumerate(priorities) if priority]
+    heapq.heapify(heap)
+    iteration = 0
+    while heap and iteration < max_backups:
+        priority, state = heapq.heappop(heap)
+        if -priority != priorities[state]:
+            # superseded by a later push
+            continue
+        iteration += 1
+        values[state] = backups[state]
+        priorities[state] = 0.0
+        # backups stay current: any change to a state's successors requeues it with a fresh backup
+        changed = predecessors[indptr[state]:indptr[state + 1]]
+        if not len(changed):
+            continue
+        changed_backups = state_backups(changed)
+        backups[changed] = changed_backups
+        for changed_state, backup, value in zip(changed.tolist(), changed_backups.tolist(),
+                                                values[changed].tolist()):
+            priority = abs(backup - value)
+            if priority < tol:
+                priority = 0.0
+            else:
+                heapq.heappush(heap, (-priority, changed_state))
+            priorities[changed_state] = priority
+    q_values = (r + gamma * P.dot(values)).reshape(num_states, num_actions)
+    error = np.abs(q_values.max(axis=1) - values).max()
+    return PlanningResult(values, q_values.argmax(axis=1), q_values, iteration, bool(error < tol), error)
+
+
+def evaluate_policy(env, policy, gamma=0.99, exact=True, tol=1e-6, max_iterations=10000, dense=False):
+    """ Values of a deterministic [num_states] or stochastic [num_states, num_actions] policy. exact solves
+        (I - gamma * P_pi) V = r_pi, which needs scipy unless dense; otherwise the policy's Bellman backup is
+        iterated until values change by less than tol. """
+    P, r = model_matrices(env, dense=dense)
+    num_states = P.shape[1]
+    num_actions = P.shape[0] // num_states
+    policy = np.asarray(policy)
+    if policy.ndim == 1:
+        rows = np.arange(num_states) * num_actions + policy
+        P_pi, r_pi = P[rows], r[rows]
+    else:
+        weights = policy.reshape(-1).astype(np.float64)
+        r_pi = (weights * r).reshape(num_states, num_actions).sum(axis=1)
+        if dense:
+            P_pi = (weights[:, None] * P).reshape(num_states, num_actions, num_states).sum(axis=1)
+        else:
+            selector = ModelMatrix(np.arange(num_states + 1) * num_actions, np.arange(num_states * num_actions),
+                                   weights, num_states * num_actions)
+            P_pi = selector.to_scipy().dot(P.to_scipy()).tocsr()
+
+    if exact:
+        if dense:
+            values = np.linalg.solve(np.eye(num_states) - gamma * P_pi, r_pi)
+        else:
+            P_pi = _as_scipy(P_pi)
+            from scipy.sparse import identity
+            from scipy.sparse.linalg import spsolve
+            values = spsolve((identity(num_states, format='csr') - gamma * P_pi).tocsc(), r_pi)
+        error = np.abs(r_pi + gamma * P_pi.dot(values) - values).max()
+        iteration = 1
+    else:
+        values = np.zeros(num_states)
+        error = np.inf
+        iteration = 0
+        for iteration in range(1, max_iterations + 1):
+            new_values = r_pi + gamma * P_pi.dot(values)
+            error = np.abs(new_values - values).max()
+            values = new_values
+            if error < tol:
+                break
+    q_values = (r + gamma * P.dot(values)).reshape(num_states, num_actions)
+    return PlanningResult(values, policy, q_values, iteration, bool(error < tol), error)
+
+
+def _as_scipy(matrix):
+    return matrix.to_scipy() if isinstance(matrix, ModelMatrix) else matrix
+
+
+def _get_model(env):
+    if hasattr(env, 'unwrapped'):
+        return env.unwrapped.model
+    return env
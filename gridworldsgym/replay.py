@@ -0,0 +1,172 @@
+""" A store of logged transitions for replay and offline learning, kept as preallocated typed columns.
+
+    Transitions are written into a ring buffer of capacity rows, one column per field, so adding a step only
+    writes six scalars into arrays and never allocates a Python object per step. Once full, new transitions
+    overwrite the oldest. With a path, the columns are memory-mapped .npy files in that directory, so the store
+    can be larger than memory, the operating system spills it to disk, and it can be reopened with
+    TransitionStore.load, e.g. to train offline from a logged run.
+
+    Episodes are the runs of transitions between one that is done, or an explicit end_episode, and the next.
+    They are tracked by their first row, so sample_episodes returns whole episodes in the order they happened.
+"""
+import json
+import os
+from collections import namedtuple
+
+import numpy as np
+from gym.utils import seeding
+
+COLUMNS = (('states', np.int32), ('actions', np.int32), ('rewards', np.float32), ('next_states', np.int32),
+           ('dones', np.bool_), ('probs', np.float32))
+
+Transitions = namedtuple('Transitions', [name for name, dtype in COLUMNS])
+
+# transitions of several episodes, episode i in rows indptr[i]:indptr[i + 1]
+Episodes = namedtuple('Episodes', ['transitions', 'indptr'])
+
+METADATA = 'store.json'
+
+
+class TransitionStore(object):
+    """ The last capacity transitions (state, action, reward, next_state, done, prob) in int32, int32, float32,
+        int32, bool and float32 columns, in memory or, with a path, in memory-mapped files in that directory.
+        Rows are addressed by their position in the log, 0 for the first transition ever added, which is
+        stored in row position % capacity while it is among the last capacity. A path that already holds a
+        store is only written over with overwrite=True; TransitionStore.load reopens it instead.
+    """
+
+    def __init__(self, capacity, path=None, seed=None, overwrite=False):
+        self.capacity = capacity
+        self.path = path
+        self.total = 0
+        self.num_episodes = 0
+        self.episode_open = False
+        self._first_episode = 0
+        if path is None:
+            self.columns = Transitions(*[np.zeros(capacity, dtype=dtype) for name, dtype in COLUMNS])
+            self.episode_starts = np.zeros(capacity, dtype=np.int64)
+        else:
+            if os.path.exists(os.path.join(path, METADATA)) and not overwrite:
+                raise FileExistsError('{} already holds a TransitionStore: reopen it with TransitionStore.load, '
+                                      'or pass overwrite=True to replace it'.format(path))
+            os.makedirs(path, exist_ok=True)
+            self.columns = Transitions(*[self._open_column(name, 'w+', dtype) for name, dtype in COLUMNS])
+            self.episode_starts = self._open_column('episode_starts', 'w+', np.int64)
+        self.np_random = None
+        self.seed(seed)
+        # marks the path as holding a store from the start, so that it is never truncated by mistake
+        self.flush()
+
+    @classmethod
+    def load(cls, path, seed=None):
+        """ Reopens the store saved in path by flush or close, to sample from it or add to it. """
+        with open(os.path.join(path, METADATA)) as f:
+            metadata = json.load(f)
+        store = cls.__new__(cls)
+        store.capacity = metadata['capacity']
+        store.path = path
+        store.total = metadata['total']
+        store.num_episodes = metadata['num_episodes']
+        store.episode_open = metadata['episode_open']
+        store._first_episode = metadata['first_episode']
+        store.columns = Transitions(*[store._open_column(name, 'r+') for name, dtype in COLUMNS])
+        store.episode_starts = store._open_column('episode_starts', 'r+')
+        store.np_random = None
+        store.seed(seed)
+        return store
+
+    def _open_column(self, name, mode, dtype=None):
+        filename = os.path.join(self.path, name + '.npy')
+        if mode == 'w+':
+            return np.lib.format.open_memmap(filename, mode=mode, dtype=dtype, shape=(self.capacity,))
+        return np.load(filename, mmap_mode=mode)
+
+    def seed(self, seed=None):
+        self.np_random, seed = seeding.np_random(seed)
+        return [seed]
+
+    def __len__(self):
+        return min(self.total, self.capacity)
+
+    def add(self, state, action, reward, next_state, done, prob=1.0):
+        """ Appends a transition, starting a new episode if the last one ended. """
+        if not self.episode_open:
+            self.episode_starts[self.num_episodes % self.capacity] = self.total
+            self.num_episodes += 1
+            self.episode_open = True
+        row = self.total % self.capacity
+        columns = self.columns
+        columns.states[row] = state
+        columns.actions[row] = action
+        columns.rewards[row] = reward
+        columns.next_states[row] = next_state
+        columns.dones[row] = done
+        columns.probs[row] = prob
+        self.total += 1
+        if done:
+            self.episode_open = False
+
+    def end_episode(self):
+        """ Ends the current episode without a done transition, e.g. when it is cut off by a time limit. """
+        self.episode_open = False
+
+    def positions(self):
+        """ The positions in the log of the transitions held, oldest first. """
+        return np.arange(self.total - len(self), self.total)
+
+    def gather(self, positions):
+        """ The Transitions at the given positions in the log, which must be held. """
+        rows = np.asarray(positions) % self.capacity
+        return Transitions(*[column[rows] for column in self.columns])
+
+    def sample(self, batch_size):
+        """ batch_size transitions drawn uniformly, with replacement, from those held. """
+        if not len(self):
+            raise ValueError('cannot sample from an empty store')
+        return self.gather(self.total - len(self) + self.np_random.randint(len(self), size=batch_size))
+
+    def episodes(self):
+        """ The first and last episode numbers of the finished episodes that are fully held. Episodes that
+            began before the oldest transition held were partly overwritten and are skipped. """
+        oldest = self.total - len(self)
+        # every episode has a transition, so an episode more than capacity episodes back began before oldest
+        first = max(self._first_episode, self.num_episodes - self.capacity)
+        while first < self.num_episodes and self.episode_starts[first % self.capacity] < oldest:
+            first += 1
+        self._first_episode = first
+        return first, self.num_episodes - 1 - self.episode_open
+
+    def sample_episodes(self, num_episodes):
+        """ num_episodes finished episodes drawn uniformly, with replacement, from those held, as Episodes. """
+        first, last = self.episodes()
+        if last < first:
+            raise ValueError('the store holds no finished episode')
+        episodes = self.np_random.randint(first, last + 1, size=num_episodes)
+        return self.gather_episodes(episodes)
+
+    def gather_episodes(self, episodes):
+        """ The Episodes with the given episode numbers, which must be finished and held. """
+        episodes = np.asarray(episodes, dtype=np.int64)
+        starts = self.episode_starts[episodes % self.capacity]
+        following = episodes + 1
+        stops = np.where(following < self.num_episodes, self.episode_starts[following % self.capacity],
+                         self.total)
+        lengths = stops - starts
+        indptr = np.zeros(len(episodes) + 1, dtype=np.int64)
+        np.cumsum(lengths, out=indptr[1:])
+        positions = np.repeat(starts - indptr[:-1], lengths) + np.arange(indptr[-1])
+        return Episodes(self.gather(positions), indptr)
+
+    def flush(self):
+        """ Writes memory-mapped columns and the counters needed by load to disk. """
+        if self.path is None:
+            return
+        for column in self.columns + (self.episode_starts,):
+            column.flush()
+        metadata = {'capacity': self.capacity, 'total': self.total, 'num_episodes': self.num_episodes,
+                    'episode_open': self.episode_open, 'first_episode': self._first_episode}
+        with open(os.path.join(self.path, METADATA), 'w') as f:
+            json.dump(metadata, f)
+
+    def close(self):
+        self.flush()
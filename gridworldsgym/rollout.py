@@ -0,0 +1,105 @@
+""" Monte Carlo evaluation of tabular policies, with every episode simulated in lockstep over the compiled
+    TransitionModel instead of through env.step.
+
+    Episodes follow the same rules as stepping the environment: they start from a state drawn from isd, an
+    outcome is sampled from the model for each action, its reward is R(next_state) and an outcome flagged done
+    ends the episode. Random numbers are drawn in the same order as by a serial loop, so a single episode with
+    a given seed is exactly the episode of an environment seeded the same way.
+"""
+from collections import namedtuple
+
+import numpy as np
+from gym.utils import seeding
+
+from gridworldsgym.util import kernels
+
+RolloutResult = namedtuple('RolloutResult', ['returns', 'lengths', 'visits'])
+
+
+def rollout(env, policy, num_episodes, horizon, gamma=1.0, seed=None, count_visits=False):
+    """ Runs num_episodes episodes of at most horizon steps of a deterministic [num_states] or stochastic
+        [num_states, num_actions] policy. Returns their discounted returns and lengths and, if count_visits,
+        how many times each state was acted in over all episodes. Each step of a stochastic policy first
+        draws the action, by the same rule as FiniteStateMDP._sample, then the outcome.
+    """
+    env = env.unwrapped
+    model = env.model
+    np_random, _ = seeding.np_random(seed)
+    policy = np.asarray(policy)
+    if policy.ndim == 1:
+        # the rows of the model the policy takes in each state
+        policy_rows = np.arange(model.num_states) * model.num_actions + policy
+        policy_cdf = None
+    else:
+        policy_rows = None
+        # stored by action, so that each action's column is contiguous
+        policy_cdf = np.ascontiguousarray(np.cumsum(policy, axis=1).T)
+    next_states, rewards, dones = model.next_states, model.rewards, model.dones
+
+    isd_cdf = np.cumsum(np.asarray(env.isd, dtype=np.float64))
+    states = np.searchsorted(isd_cdf, np_random.rand(num_episodes), side='right')
+    states[states == len(isd_cdf)] = 0
+    episodes = np.arange(num_episodes)
+    returns = np.zeros(num_episodes)
+    lengths = np.zeros(num_episodes, dtype=np.int64)
+    visits = np.zeros(model.num_states, dtype=np.int64) if count_visits else None
+    if kernels.compiled is not None:
+        _compiled_rollout(model, np_random, policy_rows, policy_cdf, states, episodes, horizon, gamma, returns,
+                          lengths, visits)
+        return RolloutResult(returns, lengths, visits)
+    discount = 1.0
+    for t in range(horizon):
+        if not len(episodes):
+            break
+        if count_visits:
+            visits += np.bincount(states, minlength=model.num_states)
+        if policy_cdf is None:
+            rows = policy_rows[states]
+        else:
+            # the first action whose cumulative probability exceeds the draw, else the first, as in sample_rows
+            actions = np.zeros(len(states), dtype=np.int64)
+            u = np_random.rand(len(states))
+            for action in range(model.num_actions):
+                actions += policy_cdf[action][states] <= u
+            actions[actions == model.num_actions] = 0
+            rows = states * model.num_actions + actions
+        index = model.sample_rows(rows, np_random.rand(len(states)))
+        returns[episodes] += discount * rewards[index]
+        lengths[episodes] = t + 1
+        running = ~dones[index]
+        states = next_states[index][running]
+        episodes = episodes[running]
+        discount *= gamma
+    return RolloutResult(returns, lengths, visits)
+
+
+def _compiled_rollout(model, np_random, policy_rows, policy_cdf, states, episodes, horizon, gamma, returns,
+                      lengths, visits, block_size=2 ** 16):
+    """ The loop of rollout in kernels.rollout_steps. Uniforms are drawn block_size or more at a time, which
+        gives the same numbers in the same order as drawing them step by step. """
+    discounts = np.empty(horizon)
+    discount = 1.0
+    for t in range(horizon):
+        discounts[t] = discount
+        discount *= gamma
+    # rewards are scaled in their own dtype, as NumPy scales an array by a Python float
+    discounts = discounts.astype(model.rewards.dtype)
+    if policy_rows is None:
+        policy_rows = np.zeros(0, dtype=np.int64)
+    else:
+        policy_cdf = np.zeros((0, 0))
+    draws = 1 if len(policy_rows) else 2
+    states = states.astype(np.int64)
+    num_active, t, position = len(states), 0, 0
+    uniforms = np.zeros(0)
+    visits = np.zeros(0, dtype=np.int64) if visits is None else visits
+    indptr, row_length = model._kernel_args()
+    while True:
+        num_active, t, position = kernels.compiled.rollout_steps(
+            indptr, row_length, model.cdf, model.next_states, model.rewards, model.dones, model.num_actions,
+            policy_rows, policy_cdf, states, episodes, num_active, t, horizon, discounts, uniforms, position, returns,
+            lengths, visits)
+        if t >= horizon or not num_active:
+            return
+        uniforms = np.concatenate([uniforms[position:], np_random.rand(max(block_size, draws * num_active))])
+        position = 0
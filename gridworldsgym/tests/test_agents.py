@@ -0,0 +1,37 @@
+import numpy as np
+import pytest
+import gridworldsgym
+from gridworldsgym.agents import QLearning, Sarsa, ExpectedSarsa, train
+from gridworldsgym.envs import GridWorldVectorEnv
+from gridworldsgym.rollout import rollout
+
+
+def _greedy_returns(env, agents):
+    return [rollout(env, policy, 1, 100).returns[0] for policy in agents.q.argmax(axis=2)]
+
+
+@pytest.mark.parametrize('agents_class', [QLearning, Sarsa, ExpectedSarsa])
+def test_cliff_paths(agents_class):
+    envs = GridWorldVectorEnv('CliffGridWorld-v0', 4)
+    envs.seed(0)
+    agents = agents_class.for_env(envs.env, 4, alpha=0.5, gamma=1.0, epsilon=0.1, seed=0)
+    train(envs, agents, 20000)
+    returns = np.array(_greedy_returns(envs.env, agents))
+    if agents_class is QLearning:
+        # the optimal path, along the cliff
+        assert np.all(returns == -13.0)
+    else:
+        # on-policy learners take a safer, longer path
+        assert np.all((returns < -13.0) & (returns > -100.0))
+
+
+def test_sweep_reports_finished_episodes():
+    envs = GridWorldVectorEnv('WindyGridWorld-v0', 6)
+    envs.seed(1)
+    agents = QLearning.for_env(envs.env, 6, alpha=np.linspace(0.1, 0.6, 6), epsilon=[0.0, 0.05, 0.1] * 2, seed=1)
+    result = train(envs, agents, 3000)
+    assert set(result.agents) == set(range(6))
+    assert np.all(np.diff(result.steps) >= 0)
+    assert np.all(result.returns == -result.lengths)
+    for agent in range(6):
+        assert result.lengths[result.agents == agent].sum() <= 3000
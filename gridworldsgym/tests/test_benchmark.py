@@ -0,0 +1,36 @@
+import json
+
+import gym
+import pytest
+
+from gridworldsgym import benchmark
+
+
+def test_benchmark_writes_json(tmpdir):
+    path = str(tmpdir.join('results.json'))
+    benchmark.main(['--output', path, '--env-ids', 'SlipperyGridWorld-v0', '--steps', '100', '--num-envs', '4',
+                    '--vector-steps', '10', '--sizes', '4x3', '20x10', '--frames', '5', '--import-repeat', '1'])
+    with open(path) as f:
+        results = json.load(f)
+    assert results['step']['SlipperyGridWorld-v0']['steps_per_second'] > 0
+    assert results['vector_step']['SlipperyGridWorld-v0']['steps'] == 40
+    assert [(r['width'], r['height']) for r in results['construction']] == [(4, 3), (20, 10)]
+    assert all(r['peak_bytes'] > 0 for r in results['construction'])
+    assert results['render']['SlipperyGridWorld-v0']['frames_per_second'] > 0
+    assert all(results['import'][name] > 0 for name in ['gridworldsgym', 'make', 'first_step'])
+
+
+def test_registered_ids():
+    assert benchmark.registered_ids() == ['CliffGridWorld-v0', 'GridWorld-v0', 'MapGridWorld-v0',
+                                          'SlipperyCliffGridWorld-v0', 'SlipperyGridWorld-v0', 'WindyGridWorld-v0']
+
+
+def test_bounded_width_ids_reject_wider_sizes():
+    with pytest.raises(SystemExit):
+        benchmark.main(['--size-env-id', 'WindyGridWorld-v0', '--sizes', '9x7', '20x7'])
+    with pytest.raises(ValueError):
+        gym.make('WindyGridWorld-v0', width=20)
+    # narrower grids keep the wind of their columns, as they always have
+    env = gym.make('WindyGridWorld-v0', width=9)
+    env.reset()
+    assert env.step(1)[0] == 22
@@ -0,0 +1,78 @@
+import os
+
+import gym
+import numpy as np
+import gridworldsgym
+from gridworldsgym.envs import GridWorldV0, WindyGridWorldV0
+from gridworldsgym.envs.cache import MODEL_VERSION, ModelCache
+
+
+def test_same_layout_shares_model():
+    first = gym.make('SlipperyCliffGridWorld-v0').unwrapped
+    second = gym.make('SlipperyCliffGridWorld-v0').unwrapped
+    other = gym.make('CliffGridWorld-v0').unwrapped
+    assert first.model is second.model
+    assert other.model is not first.model
+    assert not first.model.next_states.flags.writeable
+
+
+def test_layout_change_changes_key():
+    env = WindyGridWorldV0()
+    key = env._model_key()
+    env.wind = [0] * 10
+    assert env._model_key() != key
+    env = GridWorldV0()
+    key = env._model_key()
+    env.rewards = env.rewards * 2
+    assert env._model_key() != key
+
+
+def test_rewards_replaced_without_touching_shared_model():
+    env = GridWorldV0()
+    shared = env.model
+    env.rewards = env.rewards * 2
+    assert env.model is not shared
+    assert env.model.next_states is shared.next_states
+    assert np.allclose(env.model.rewards, 2 * shared.rewards, equal_nan=True)
+
+
+def test_lru_eviction():
+    cache = ModelCache(max_size=2)
+    envs = [GridWorldV0(width=w) for w in (4, 5, 6)]
+    for env in envs:
+        cache.get_or_build(env._model_key(), env._generate_model)
+    assert list(cache.models) == [envs[1]._model_key(), envs[2]._model_key()]
+
+
+def test_disk_cache_is_memory_mapped(tmp_path):
+    env = GridWorldV0(width=7, height=5, slippery=True)
+    ModelCache(directory=str(tmp_path), min_disk_bytes=0).get_or_build(env._model_key(), env._generate_model)
+    model = ModelCache(directory=str(tmp_path)).get_or_build(env._model_key(), lambda: None)
+    assert isinstance(model.next_states, np.memmap)
+    for name, array in model.to_arrays().items():
+        assert np.array_equal(array, getattr(env.model, name))
+    # models are saved under the version of their format, so older versions are never read back
+    assert os.listdir(str(tmp_path)) == ['v{}'.format(MODEL_VERSION)]
+
+
+def test_disk_cache_is_bounded(tmp_path):
+    envs = [GridWorldV0(width=w, height=5, slippery=True) for w in (7, 8, 9)]
+    ModelCache(directory=str(tmp_path)).get_or_build(envs[0]._model_key(), envs[0]._generate_model)
+    # small models are not worth saving
+    assert not os.listdir(str(tmp_path))
+    cache = ModelCache(directory=str(tmp_path), min_disk_bytes=0, max_disk_bytes=20000)
+    for env in envs:
+        cache.get_or_build(env._model_key(), env._generate_model)
+    saved = os.listdir(os.path.join(str(tmp_path), 'v{}'.format(MODEL_VERSION)))
+    # each model takes 12 to 16 KB, so only the most recent one is kept
+    assert saved == [envs[2]._model_key()]
+
+
+def test_model_pruned_while_loading_is_rebuilt(tmp_path):
+    env = GridWorldV0(width=7, height=5, slippery=True)
+    ModelCache(directory=str(tmp_path), min_disk_bytes=0).get_or_build(env._model_key(), env._generate_model)
+    # another process has started deleting the model's directory
+    os.remove(os.path.join(str(tmp_path), 'v{}'.format(MODEL_VERSION), env._model_key(), 'meta.json'))
+    model = ModelCache(directory=str(tmp_path)).get_or_build(env._model_key(), env._generate_model)
+    assert not isinstance(model.next_states, np.memmap)
+    assert np.array_equal(model.next_states, env.model.next_states)
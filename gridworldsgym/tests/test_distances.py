@@ -0,0 +1,53 @@
+import gym
+import numpy as np
+import pytest
+import gridworldsgym
+from gridworldsgym.envs import MapGridWorldV0
+from gridworldsgym.envs.distances import UNREACHABLE, distance_field
+from gridworldsgym.envs.levels import LevelGenerator, level_distances
+
+
+ENV_IDS = ['GridWorld-v0', 'SlipperyGridWorld-v0', 'WindyGridWorld-v0', 'CliffGridWorld-v0',
+           'SlipperyCliffGridWorld-v0']
+
+
+def test_distances_of_registered_ids():
+    gridworld = distance_field(gym.make('GridWorld-v0'))
+    assert gridworld.distances.tolist() == [5, 4, 3, 4, 4, UNREACHABLE, 2, UNREACHABLE, 3, 2, 1, 0]
+    assert gridworld.actions[11] == -1 and gridworld.actions[10] == 1
+    # the shortest path of the windy grid world takes 15 steps
+    assert distance_field(gym.make('WindyGridWorld-v0')).distances[30] == 15
+    cliff = distance_field(gym.make('SlipperyCliffGridWorld-v0')).distances.reshape(4, 12)
+    assert cliff[3, 0] == 13 and (cliff[3, 1:-1] == UNREACHABLE).all()
+
+
+@pytest.mark.parametrize('env_id', ENV_IDS)
+def test_actions_follow_shortest_paths(env_id):
+    env = gym.make(env_id).unwrapped
+    field = distance_field(env)
+    assert distance_field(gym.make(env_id)) is field
+    assert not field.distances.flags.writeable
+    for state in np.flatnonzero(field.distances > 0):
+        # the most likely outcome of the optimal action is one step closer
+        outcomes = env.P(state, field.actions[state])
+        next_state = max(outcomes, key=lambda outcome: outcome[0])[1]
+        assert field.distances[next_state] == field.distances[state] - 1
+
+
+def test_level_distances_match_distance_field():
+    levels = LevelGenerator(7, 9, kind='wind', batch_size=16, seed=4).sample(5)
+    walls, goals, terminals, wind = [np.stack([getattr(level, name) for level in levels])
+                                     for name in ['walls', 'goals', 'terminals', 'wind']]
+    batch = level_distances(walls, goals, terminals, wind)
+    for i, level in enumerate(levels):
+        field = distance_field(MapGridWorldV0(level))
+        assert np.array_equal(batch.distances[i].reshape(-1), field.distances)
+        assert np.array_equal(batch.actions[i].reshape(-1), field.actions)
+
+
+def test_edits_change_distances():
+    env = gym.make('GridWorld-v0').unwrapped
+    assert distance_field(env).distances[0] == 5
+    env.add_wall(0, 1)
+    env.add_wall(1, 0)
+    assert distance_field(env).distances[0] == UNREACHABLE
@@ -0,0 +1,63 @@
+import gym
+import numpy as np
+import pytest
+import gridworldsgym
+from gridworldsgym.envs import GridMap, MapGridWorldV0
+from gridworldsgym.envs.grid_map import classic_map
+from gridworldsgym.envs.model import TransitionModel
+
+CLASSIC_IDS = ['GridWorld-v0', 'SlipperyGridWorld-v0', 'WindyGridWorld-v0', 'CliffGridWorld-v0',
+               'SlipperyCliffGridWorld-v0']
+
+
+def _assert_same_env(env, expected):
+    assert np.array_equal(env.isd, expected.isd)
+    assert np.array_equal(env.rewards, expected.rewards, equal_nan=True)
+    for name in TransitionModel.ARRAYS:
+        assert np.array_equal(getattr(env.model, name), getattr(expected.model, name), equal_nan=True), name
+
+
+@pytest.mark.parametrize('env_id', CLASSIC_IDS)
+def test_classic_maps_compile_to_registered_models(env_id):
+    expected = gym.make(env_id).unwrapped
+    env = MapGridWorldV0(classic_map(env_id), slippery=getattr(expected, 'slippery', False),
+                         absorbing=env_id == 'WindyGridWorld-v0')
+    _assert_same_env(env, expected)
+    assert env.goal_states == expected.goal_states and env.terminal_states == expected.terminal_states
+
+
+@pytest.mark.parametrize('env_id', CLASSIC_IDS)
+def test_from_env(env_id):
+    expected = gym.make(env_id).unwrapped
+    env = MapGridWorldV0(GridMap.from_env(expected), slippery=expected.slippery,
+                         absorbing=env_id == 'WindyGridWorld-v0')
+    _assert_same_env(env, expected)
+
+
+def test_ascii_map():
+    grid_map = GridMap.from_ascii('''
+S.#
+.#G
+S.T
+''', rewards={'G': 5.0, 'T': -5.0}, default_reward=-1.0)
+    env = gym.make('MapGridWorld-v0', grid_map=grid_map).unwrapped
+    assert env.illegal_states == ((0, 2), (1, 1))
+    assert np.array_equal(env.isd, [0.5, 0, 0, 0, 0, 0, 0.5, 0, 0])
+    assert env.rewards[env._to_state(1, 2)] == 5.0 and env.rewards[env._to_state(2, 2)] == -5.0
+    assert np.isnan(env.rewards[env._to_state(1, 1)])
+    env.reset()
+    env.state = env._to_state(2, 1)
+    assert env.step(1)[:3] == (env._to_state(2, 2), -5.0, True)
+    # walls stop the agent
+    env.state = env._to_state(0, 1)
+    assert env.step(1)[0] == env._to_state(0, 1)
+
+
+@pytest.mark.parametrize('slippery', [False, True])
+def test_border_walls_leave_no_nan_in_model(slippery):
+    env = MapGridWorldV0(GridMap.from_ascii('S.#\n..G', rewards={'G': 1.0}), slippery=slippery)
+    assert np.isnan(env.rewards[2])
+    assert np.isfinite(env.model.rewards).all()
+    env.transitions
+    env.rewards = env.rewards * 2
+    assert np.isfinite(env.model.rewards).all()
@@ -0,0 +1,31 @@
+import json
+import subprocess
+import sys
+
+
+GUI_MODULES = ('pyglet', 'OpenGL', 'gridworldsgym.util.rendering')
+
+# seconds allowed to import gridworldsgym.envs after gym, make every id and step each once; about 0.02 is usual
+MAX_STARTUP_SECONDS = 1.0
+
+STARTUP_SCRIPT = '''
+import json, sys, time
+import gym
+start = time.perf_counter()
+import gridworldsgym.envs
+for env_id in ['GridWorld-v0', 'SlipperyGridWorld-v0', 'WindyGridWorld-v0', 'CliffGridWorld-v0',
+               'SlipperyCliffGridWorld-v0']:
+    env = gym.make(env_id)
+    env.reset()
+    env.step(env.action_space.sample())
+print(json.dumps({'modules': sorted(sys.modules), 'seconds': time.perf_counter() - start}))
+'''
+
+
+def test_startup_is_quick_and_loads_no_gui_modules():
+    # run in a fresh interpreter, since this one may already have rendered something
+    output = subprocess.check_output([sys.executable, '-W', 'ignore', '-c', STARTUP_SCRIPT])
+    startup = json.loads(output.decode().splitlines()[-1])
+    loaded = [m for m in startup['modules'] if m == 'gridworldsgym.util.rendering' or m.split('.')[0] in GUI_MODULES]
+    assert loaded == []
+    assert startup['seconds'] < MAX_STARTUP_SECONDS
@@ -0,0 +1,73 @@
+import os
+import subprocess
+import sys
+import threading
+
+import gym
+import gridworldsgym
+from gridworldsgym.envs.cache import model_cache
+from gridworldsgym.util import instrumentation
+
+
+def test_records_steps_episodes_and_builds():
+    instrumentation.reset()
+    instrumentation.enable()
+    try:
+        model_cache.clear()
+        env = gym.make('CliffGridWorld-v0')
+        env.reset()
+
+        def run():
+            for _ in range(3):
+                env.step(1)
+                env.reset()
+
+        thread = threading.Thread(target=run)
+        thread.start()
+        thread.join()
+        for action in [0, 1]:
+            env.step(action)
+        env.render(mode='rgb_array')
+        stats = instrumentation.scrape()
+    finally:
+        instrumentation.disable()
+    timers = stats['timers']
+    assert timers['step']['count'] == 5 and timers['sample']['count'] == 5
+    assert stats['counters']['episodes'] == 3
+    assert timers['reset']['count'] == 5
+    assert timers['model_build']['count'] == 1 and timers['render']['count'] == 1
+    assert sum(n for _, n in timers['step']['histogram']) == 5
+    assert timers['step']['total_seconds'] > 0
+
+
+def test_disabled_records_nothing():
+    instrumentation.reset()
+    env = gym.make('GridWorld-v0')
+    env.step(0)
+    env.reset()
+    assert instrumentation.scrape() == {'counters': {}, 'timers': {}}
+
+
+def test_finished_threads_are_folded_into_totals():
+    instrumentation.reset()
+    instrumentation.enable()
+    try:
+        env = gym.make('GridWorld-v0')
+        env.reset()
+        for _ in range(20):
+            thread = threading.Thread(target=env.step, args=(1,))
+            thread.start()
+            thread.join()
+        stats = instrumentation.scrape()
+    finally:
+        instrumentation.disable()
+    assert stats['timers']['step']['count'] == 20
+    assert len(instrumentation._all_stats) <= threading.active_count()
+
+
+def test_environment_variable_values():
+    script = 'import gridworldsgym.util.instrumentation as i; print(i.enabled)'
+    for value, expected in [('1', 'True'), ('0', 'False'), ('false', 'False')]:
+        env = dict(os.environ, GRIDWORLDSGYM_INSTRUMENTATION=value)
+        output = subprocess.check_output([sys.executable, '-c', script], env=env, universal_newlines=True)
+        assert output.strip() == expected, value
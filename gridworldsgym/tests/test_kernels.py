@@ -0,0 +1,84 @@
+import importlib.util
+import os
+import subprocess
+import sys
+
+import gym
+import numpy as np
+import pytest
+import gridworldsgym
+from gridworldsgym import planning
+from gridworldsgym.envs import GridWorldVectorEnv
+from gridworldsgym.rollout import rollout
+from gridworldsgym.util import kernels
+
+
+ENV_IDS = ['SlipperyGridWorld-v0', 'WindyGridWorld-v0', 'SlipperyCliffGridWorld-v0']
+
+
+@pytest.fixture
+def restore_backend():
+    yield
+    kernels.use_backend('numpy')
+
+
+def _run(env_id, compact):
+    env = gym.make(env_id, compact=compact).unwrapped
+    policy = planning.value_iteration(env, gamma=0.9).policy
+    uniform = np.full((env.num_states, env.num_actions), 1.0 / env.num_actions)
+    # enough episodes that the stochastic rollout draws several blocks of uniforms
+    results = [rollout(env, policy, 100, 50, gamma=0.9, seed=1, count_visits=True),
+               rollout(env, uniform, 2000, 100, gamma=0.9, seed=2)]
+    env.seed(3)
+    env.reset()
+    steps = [env.step(action % 4)[:3] for action in range(200)]
+    envs = GridWorldVectorEnv(env_id, 8, compact=compact)
+    envs.seed(4)
+    envs.reset()
+    vector_steps = [envs.step(np.arange(8) % 4)[:3] for _ in range(50)]
+    return results, steps, vector_steps
+
+
+def _assert_same(expected, actual):
+    for a, b in zip(expected[0], actual[0]):
+        for x, y in zip(a, b):
+            assert (x is None and y is None) or np.array_equal(x, y)
+    assert expected[1] == actual[1]
+    for a, b in zip(expected[2], actual[2]):
+        for x, y in zip(a, b):
+            assert np.array_equal(x, y)
+
+
+@pytest.mark.parametrize('env_id', ENV_IDS)
+@pytest.mark.parametrize('compact', [False, True])
+def test_python_kernels_match_numpy(env_id, compact, monkeypatch):
+    expected = _run(env_id, compact)
+    monkeypatch.setattr(kernels, 'compiled', kernels.PYTHON_KERNELS)
+    _assert_same(expected, _run(env_id, compact))
+
+
+@pytest.mark.parametrize('env_id', ENV_IDS)
+def test_numba_kernels_match_numpy(env_id, restore_backend):
+    pytest.importorskip('numba')
+    expected = _run(env_id, False)
+    assert kernels.use_backend('numba') == 'numba'
+    _assert_same(expected, _run(env_id, False))
+
+
+def test_use_backend(restore_backend):
+    with pytest.raises(ValueError):
+        kernels.use_backend('cython')
+    assert kernels.use_backend('auto') in kernels.BACKENDS
+    assert kernels.use_backend('numpy') == 'numpy' and kernels.compiled is None
+
+
+@pytest.mark.parametrize('name', ['cython', 'numba'])
+def test_unusable_environment_backend_falls_back(name):
+    if name == 'numba' and importlib.util.find_spec('numba') is not None:
+        pytest.skip('numba is installed')
+    env = dict(os.environ, GRIDWORLDSGYM_BACKEND=name)
+    result = subprocess.run([sys.executable, '-W', 'always', '-c',
+                             'import gridworldsgym.util.kernels as k; print(k.backend)'],
+                            env=env, stdout=subprocess.PIPE, stderr=subprocess.PIPE, universal_newlines=True)
+    assert result.returncode == 0 and result.stdout.strip() == 'numpy'
+    assert 'GRIDWORLDSGYM_BACKEND' in result.stderr
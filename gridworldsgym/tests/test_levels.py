@@ -0,0 +1,65 @@
+import numpy as np
+import pytest
+from gym.utils import seeding
+from gridworldsgym.envs import GridMap, MapGridWorldV0
+from gridworldsgym.envs.grid_map import CLIFF, classic_map
+from gridworldsgym.envs.levels import KINDS, LevelGenerator, generate, next_state_table, solvable
+
+
+def _stack(grid_map):
+    wind = None if grid_map.wind is None else grid_map.wind[None]
+    return grid_map.walls[None], grid_map.start[None], grid_map.goals[None], grid_map.terminals[None], wind
+
+
+@pytest.mark.parametrize('kind', KINDS)
+def test_levels_are_solvable(kind):
+    levels = LevelGenerator(9, 11, kind=kind, batch_size=64, seed=0).sample(100)
+    assert len(levels) == 100
+    for grid_map in levels:
+        assert grid_map.start.sum() == 1 and grid_map.goals.sum() == 1
+        assert not (grid_map.walls & (grid_map.goals | (grid_map.start > 0))).any()
+        assert solvable(*_stack(grid_map))[0]
+
+
+@pytest.mark.parametrize('kind', KINDS)
+def test_next_state_table_matches_model(kind):
+    for grid_map in LevelGenerator(7, 8, kind=kind, batch_size=8, seed=1).sample(3):
+        env = MapGridWorldV0(grid_map)
+        walls, _, _, _, wind = _stack(grid_map)
+        assert np.array_equal(next_state_table(walls, wind)[0], env.model.next_states.reshape(-1, 4))
+
+
+def test_solvable():
+    assert solvable(*_stack(classic_map('CliffGridWorld-v0')))[0]
+    assert solvable(*_stack(classic_map('WindyGridWorld-v0')))[0]
+    blocked = GridMap.from_ascii('S#G\n.#.')
+    assert not solvable(*_stack(blocked))[0]
+    cut_off = GridMap.from_ascii('ST.\nTTG')
+    assert not solvable(*_stack(cut_off))[0]
+    # every start cell must reach a goal
+    assert not solvable(*_stack(GridMap.from_ascii('S#S\n.#G')))[0]
+    assert solvable(*_stack(GridMap.from_ascii(CLIFF.replace('T', '#'))))[0]
+
+
+def test_generate_is_seeded():
+    first = generate('walls', 10, 6, 6, seeding.np_random(3)[0])
+    second = generate('walls', 10, 6, 6, seeding.np_random(3)[0])
+    for name in ['walls', 'start', 'goals', 'terminals']:
+        assert np.array_equal(first[name], second[name])
+    with pytest.raises(ValueError):
+        generate('caves', 1, 6, 6, seeding.np_random(3)[0])
+
+
+def test_load_map():
+    levels = LevelGenerator(9, 9, seed=2)
+    env = MapGridWorldV0(next(levels))
+    env.seed(0)
+    for _ in range(3):
+        grid_map = next(levels)
+        env.load_map(grid_map)
+        assert np.array_equal(env.illegal_mask, grid_map.walls.reshape(-1))
+        assert env.model.next_states.reshape(-1, 4).tolist() == next_state_table(grid_map.walls[None])[0].tolist()
+        assert env.reset() == 0
+        assert env.step(1)[0] in (0, 1)
+    with pytest.raises(ValueError):
+        env.load_map(GridMap(3, 3))
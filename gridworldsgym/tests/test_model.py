@@ -0,0 +1,126 @@
+import gym
+import numpy as np
+import pytest
+import gridworldsgym
+
+
+ENV_IDS = ['GridWorld-v0', 'SlipperyGridWorld-v0', 'WindyGridWorld-v0', 'CliffGridWorld-v0',
+           'SlipperyCliffGridWorld-v0']
+
+
+def legacy_step(transitions, rewards, state, rng, action):
+    outcomes = transitions[state][action]
+    csprobs = np.cumsum(np.asarray([t[0] for t in outcomes]))
+    prob, state, done = outcomes[(csprobs > rng.rand()).argmax()]
+    return state, rewards[state], done, {"prob": prob}
+
+
+@pytest.mark.parametrize('env_id', ENV_IDS)
+def test_model_matches_transitions(env_id):
+    env = gym.make(env_id).unwrapped
+    for state in range(env.num_states):
+        for action in range(env.num_actions):
+            assert env.model.outcomes(state, action) == list(env.P(state, action))
+
+
+@pytest.mark.parametrize('env_id', ENV_IDS)
+def test_step_matches_legacy_sampling(env_id):
+    env = gym.make(env_id).unwrapped
+    reference = gym.make(env_id).unwrapped
+    # the hand-built tables and rewards, rather than env.P, which reads the model that step samples from
+    transitions = reference_transitions(reference, absorbing=env_id.startswith('Windy'))
+    rewards = reference._generate_rewards()
+    env.seed(3)
+    reference.seed(3)
+    actions = np.random.RandomState(0).randint(env.num_actions, size=500)
+    for action in actions:
+        expected = legacy_step(transitions, rewards, reference.state, reference.np_random, action)
+        reference.state = expected[0]
+        result = env.step(action)
+        assert result[0] == expected[0] and result[2] == expected[2] and result[3] == expected[3]
+        assert np.array_equal(result[1], expected[1], equal_nan=True)
+        if result[2]:
+            env.reset()
+            reference.reset()
+
+
+def test_model_rebuilt_when_transitions_replaced():
+    env = gym.make('GridWorld-v0').unwrapped
+    model = env.model
+    env.transitions = env._generate_transitions()
+    assert env.model is not model
+
+
+def test_in_place_edits_fail_loudly():
+    env = gym.make('GridWorld-v0').unwrapped
+    rewards = env.rewards.copy()
+    with pytest.raises(ValueError):
+        env.rewards[0] = 5.0
+    rewards[0] = 5.0
+    env.rewards = rewards
+    rewards[0] = 7.0
+    assert env.rewards[0] == 5.0 and env.model.rewards[env.model.next_states == 0].max() == 5.0
+    with pytest.raises(TypeError):
+        env.transitions[0][1] = [(1.0, 0, False)]
+    with pytest.raises(TypeError):
+        env.transitions[0] = {}
+
+
+def test_compact_model():
+    env = gridworldsgym.envs.GridWorldV0(width=30, height=20, slippery=True, compact=True)
+    reference = gridworldsgym.envs.GridWorldV0(width=30, height=20, slippery=True)
+    assert env.model.next_states.dtype == np.int32 and env.model.dones.dtype == bool
+    assert env.model.probs.dtype == np.float32 and env.model.rewards.dtype == np.float32
+    assert np.array_equal(env.model.next_states, reference.model.next_states)
+    assert np.allclose(env.model.probs, reference.model.probs)
+    assert env._transitions is None
+    assert [t[1:] for t in env.transitions[31][2]] == [t[1:] for t in reference.P(31, 2)]
+
+
+def reference_transitions(env, absorbing=False):
+    # cell by cell construction the vectorized builders must reproduce
+    transitions = {}
+    offsets = [-1, 0, 1] if env.slippery else [0]
+    probs = [0.1, 0.8, 0.1] if env.slippery else [1.0]
+    for state in range(env.num_states):
+        row, col = env.to_row_col(state)
+        transitions[state] = {}
+        for action in range(env.num_actions):
+            if absorbing and ((row, col) in env.terminal_states or (row, col) in env.goal_states):
+                transitions[state][action] = [(0.0, state, True)]
+                continue
+            transitions[state][action] = []
+            for prob, offset in zip(probs, offsets):
+                new_row, new_col = env._move(row, col, (action + offset) % env.num_actions)
+                new_state = state if (new_row, new_col) in env.illegal_states else env._to_state(new_row, new_col)
+                done = (new_row, new_col) in env.terminal_states or (new_row, new_col) in env.goal_states
+                transitions[state][action].append((prob, int(new_state), done))
+    return transitions
+
+
+@pytest.mark.parametrize('env_id, kwargs', [('GridWorld-v0', {'width': 7, 'height': 5}),
+                                            ('SlipperyGridWorld-v0', {}),
+                                            ('CliffGridWorld-v0', {}),
+                                            ('SlipperyCliffGridWorld-v0', {'width': 9}),
+                                            ('WindyGridWorld-v0', {})])
+def test_generated_model_matches_reference(env_id, kwargs):
+    env = gym.make(env_id, **kwargs).unwrapped
+    expected = reference_transitions(env, absorbing=env_id.startswith('Windy'))
+    assert env.transitions == expected
+
+
+@pytest.mark.parametrize('env_id', ENV_IDS)
+def test_predecessor_index(env_id):
+    env = gym.make(env_id).unwrapped
+    expected = {state: set() for state in range(env.num_states)}
+    for state in range(env.num_states):
+        for action in range(env.num_actions):
+            for prob, next_state, _ in env.P(state, action):
+                if prob > 0:
+                    expected[next_state].add((state, action))
+    for state in range(env.num_states):
+        states, actions = env.model.predecessors(state)
+        assert list(zip(states.tolist(), actions.tolist())) == sorted(expected[state])
+    indptr, rows = env.model.predecessor_index()
+    env.rewards = env.rewards * 2
+    assert env.model.predecessor_index()[1] is rows
@@ -0,0 +1,57 @@
+import gym
+import numpy as np
+import pytest
+import gridworldsgym
+from gridworldsgym.envs import GridMap, GridWorldVectorEnv
+from gridworldsgym.envs import observations
+from gridworldsgym.envs.observations import ObservationEncoder
+from gridworldsgym.wrappers import EncodedObservation
+
+
+@pytest.mark.parametrize('mode', observations.MODES)
+def test_encoded_observations(mode):
+    env = EncodedObservation(gym.make('CliffGridWorld-v0'), mode=mode)
+    inner = env.unwrapped
+    observation = env.reset()
+    assert env.observation_space.contains(observation)
+    for action in [0, 1, 1, 2]:
+        observation = env.step(action)[0]
+        assert env.observation_space.contains(observation)
+        assert np.array_equal(observation, env.encoder.encode([inner.state])[0])
+    if mode == 'coordinates':
+        assert np.array_equal(observation, inner.to_row_col(inner.state))
+
+
+def test_egocentric_view():
+    env = gym.make('CliffGridWorld-v0').unwrapped
+    view = ObservationEncoder(env, 'egocentric').encode_state(env._to_state(3, 0))
+    # the start cell sits in the bottom left corner, with the cliff to its right
+    assert np.array_equal(view[:, :, observations.WALL], [[1, 0, 0], [1, 0, 0], [1, 1, 1]])
+    assert np.array_equal(view[:, :, observations.TERMINAL], [[0, 0, 0], [0, 0, 1], [0, 0, 0]])
+    assert not view.flags.writeable
+
+
+def test_batched_encoding_into_buffer(monkeypatch):
+    envs = GridWorldVectorEnv('SlipperyGridWorld-v0', 8, width=10, height=10)
+    states = envs.reset()
+    for max_table_states in [4096, 10]:
+        monkeypatch.setattr(observations, 'MAX_ONE_HOT_TABLE_STATES', max_table_states)
+        encoder = ObservationEncoder(envs.env, 'one_hot')
+        out = np.full((8,) + encoder.shape, 7, dtype=np.float32)
+        assert encoder.encode(states, out=out) is out
+        assert np.array_equal(out, np.eye(100)[states])
+
+
+def test_egocentric_view_follows_layout_edits():
+    env = EncodedObservation(gym.make('MapGridWorld-v0'), mode='egocentric')
+    inner = env.unwrapped
+    state = inner._to_state(0, 0)
+    assert env.encoder.encode_state(state)[1, 2, observations.WALL] == 0
+    inner.add_wall(0, 1)
+    assert env.encoder.encode_state(state)[1, 2, observations.WALL] == 1
+    inner.set_goal(1, 0)
+    assert env.encoder.encode([state])[0][2, 1, observations.GOAL] == 1
+    inner.load_map(GridMap.from_ascii('S.#.\n....\n...G'))
+    view = env.observation(state)
+    assert view[1, 2, observations.WALL] == 0 and view[2, 1, observations.GOAL] == 0
+    assert np.array_equal(view, observations.egocentric_table(inner)[state])
@@ -0,0 +1,75 @@
+import gym
+import numpy as np
+import pytest
+import gridworldsgym
+from gridworldsgym import planning
+from gridworldsgym.envs import GridMap, MapGridWorldV0
+
+
+ENV_IDS = ['GridWorld-v0', 'SlipperyGridWorld-v0', 'WindyGridWorld-v0', 'CliffGridWorld-v0',
+           'SlipperyCliffGridWorld-v0']
+
+
+def test_value_iteration_gridworld():
+    result = planning.value_iteration(gym.make('GridWorld-v0'), gamma=1.0)
+    assert result.converged
+    # four steps of -0.04 from the start state, the last of which enters the +1 goal
+    assert np.isclose(result.values[0], 0.84)
+
+
+@pytest.mark.parametrize('env_id', ENV_IDS)
+def test_solvers_agree(env_id):
+    env = gym.make(env_id)
+    sparse = planning.value_iteration(env, gamma=0.9, tol=1e-10)
+    dense = planning.value_iteration(env, gamma=0.9, tol=1e-10, dense=True)
+    modified = planning.policy_iteration(env, gamma=0.9, tol=1e-10)
+    assert sparse.converged and dense.converged and modified.converged
+    assert np.allclose(sparse.values, dense.values)
+    assert np.allclose(sparse.values, modified.values, atol=1e-8)
+
+
+@pytest.mark.parametrize('env_id', ENV_IDS)
+def test_evaluate_policy(env_id):
+    pytest.importorskip('scipy')
+    env = gym.make(env_id)
+    optimal = planning.value_iteration(env, gamma=0.9, tol=1e-12)
+    exact = planning.evaluate_policy(env, optimal.policy, gamma=0.9)
+    dense = planning.evaluate_policy(env, np.eye(4)[optimal.policy], gamma=0.9, dense=True)
+    iterative = planning.evaluate_policy(env, optimal.policy, gamma=0.9, exact=False, tol=1e-12)
+    assert exact.converged and iterative.converged
+    assert np.allclose(exact.values, optimal.values, atol=1e-8)
+    assert np.allclose(dense.values, exact.values)
+    assert np.allclose(iterative.values, exact.values, atol=1e-8)
+
+
+@pytest.mark.parametrize('env_id', ENV_IDS)
+def test_prioritized_sweeping(env_id):
+    env = gym.make(env_id)
+    expected = planning.value_iteration(env, gamma=0.9, tol=1e-12)
+    result = planning.prioritized_sweeping(env, gamma=0.9, tol=1e-12)
+    assert result.converged
+    assert np.allclose(result.values, expected.values, atol=1e-9)
+    assert np.array_equal(result.policy, expected.policy)
+
+
+def test_prioritized_sweeping_takes_fewer_backups():
+    goals = np.zeros((30, 30), dtype=bool)
+    goals[-1, -1] = True
+    env = MapGridWorldV0(GridMap(30, 30, goals=goals, rewards=goals.astype(np.float64)))
+    sweeping = planning.prioritized_sweeping(env, gamma=0.99)
+    iteration = planning.value_iteration(env, gamma=0.99)
+    assert np.allclose(sweeping.values, iteration.values, atol=1e-6)
+    # one backup per state, against a sweep over all of them per step of the longest path
+    assert sweeping.iterations == env.num_states
+    assert iteration.iterations * env.num_states > 50 * sweeping.iterations
+
+
+def test_border_walls_do_not_spoil_values():
+    # moves from the wall into the border stay in the wall, whose reward is NaN
+    env = MapGridWorldV0(GridMap.from_ascii('S.#\n..G', rewards={'G': 1.0}, default_reward=-0.1))
+    for result in [planning.value_iteration(env, gamma=0.9), planning.policy_iteration(env, gamma=0.9),
+                   planning.prioritized_sweeping(env, gamma=0.9),
+                   planning.evaluate_policy(env, np.ones(6, dtype=int), gamma=0.9, exact=False)]:
+        assert result.converged and np.isfinite(result.values).all()
+        assert result.values[2] == 0.0
+    assert planning.value_iteration(env, gamma=0.9).policy[1] == 2
@@ -0,0 +1,28 @@
+import gym
+import numpy as np
+import gridworldsgym
+from gridworldsgym.envs import GridWorldVectorEnv
+from gridworldsgym.envs.gridworld import HEADINGS
+from gridworldsgym.util.raster import GridRasterizer, to_rgb, AGENT_COLOR, GOAL_COLOR
+
+
+def test_rgb_array_frame():
+    env = gym.make('GridWorld-v0')
+    env.reset()
+    env.step(1)
+    frame = env.render(mode='rgb_array')
+    assert frame.shape == (305, 405, 3) and frame.dtype == np.uint8
+    # goal at (2, 3), agent moved right into (0, 1)
+    assert np.all(frame[252, 352] == to_rgb(GOAL_COLOR))
+    assert np.all(frame[:105, 100:205] == to_rgb(AGENT_COLOR), axis=-1).sum() > 0
+    assert np.all(frame[:105, :100] == to_rgb(AGENT_COLOR), axis=-1).sum() == 0
+
+
+def test_render_batch_matches_render():
+    envs = GridWorldVectorEnv('WindyGridWorld-v0', 16)
+    envs.reset()
+    envs.step(np.arange(16) % 4)
+    rasterizer = GridRasterizer(envs.env, square_size=10, line_width=1)
+    frames = rasterizer.render_batch(envs.states, np.asarray(HEADINGS)[envs.last_actions])
+    for frame, state, action in zip(frames, envs.states, envs.last_actions):
+        assert np.array_equal(frame, rasterizer.render(state, HEADINGS[action]))
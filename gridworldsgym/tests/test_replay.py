@@ -0,0 +1,90 @@
+import gym
+import numpy as np
+import pytest
+import gridworldsgym
+from gridworldsgym.replay import TransitionStore
+from gridworldsgym.wrappers import EncodedObservation, TransitionRecorder
+
+
+def _record(store, num_steps, seed=0):
+    """ Steps a recorded random walk, returning the transitions as a list for comparison. """
+    env = TransitionRecorder(EncodedObservation(gym.make('SlipperyCliffGridWorld-v0'), 'coordinates'), store)
+    env.seed(seed)
+    env.reset()
+    actions = np.random.RandomState(seed).randint(4, size=num_steps)
+    log = []
+    for t, action in enumerate(actions):
+        state = env.unwrapped.state
+        observation, reward, done, info = env.step(action)
+        log.append((state, action, reward, env.unwrapped.state, done, info['prob']))
+        if done or t % 50 == 49:
+            env.reset()
+    return log
+
+
+def _rows(transitions):
+    return list(zip(*[column.tolist() for column in transitions]))
+
+
+def _check_episodes(episodes):
+    transitions, indptr = episodes
+    for start, stop in zip(indptr[:-1], indptr[1:]):
+        assert stop > start
+        assert np.array_equal(transitions.next_states[start:stop - 1], transitions.states[start + 1:stop])
+        assert not transitions.dones[start:stop - 1].any()
+
+
+def test_recorder_logs_steps():
+    store = TransitionStore(1000)
+    log = _record(store, 300)
+    assert len(store) == 300
+    expected = [(s, a, np.float32(r), n, d, np.float32(p)) for s, a, r, n, d, p in log]
+    assert _rows(store.gather(store.positions())) == expected
+    assert store.columns.states.dtype == np.int32 and store.columns.rewards.dtype == np.float32
+    first, last = store.episodes()
+    # episodes end at dones and at the reset after every 50th step
+    assert last - first + 1 == sum(row[4] or t % 50 == 49 for t, row in enumerate(log))
+    _check_episodes(store.gather_episodes(np.arange(first, last + 1)))
+
+
+def test_ring_buffer_keeps_latest():
+    store = TransitionStore(64, seed=1)
+    log = _record(store, 500)
+    assert len(store) == 64 and store.total == 500
+    assert np.array_equal(store.gather(store.positions()).states, [row[0] for row in log[-64:]])
+    batch = store.sample(32)
+    assert len(batch.states) == 32
+    episodes = store.sample_episodes(10)
+    _check_episodes(episodes)
+    # only episodes that are fully held are sampled
+    first, last = store.episodes()
+    assert store.episode_starts[first % store.capacity] >= store.total - 64
+
+
+def test_memory_mapped_store(tmp_path):
+    path = str(tmp_path / 'store')
+    store = TransitionStore(100, path=path)
+    _record(store, 150)
+    store.close()
+    loaded = TransitionStore.load(path)
+    assert isinstance(loaded.columns.states, np.memmap)
+    assert _rows(loaded.gather(loaded.positions())) == _rows(store.gather(store.positions()))
+    assert loaded.episodes() == store.episodes()
+    loaded.add(1, 2, -1.0, 3, True)
+    assert loaded.total == 151 and loaded.gather([150]).next_states[0] == 3
+    # a new store never silently truncates a logged one
+    with pytest.raises(FileExistsError):
+        TransitionStore(100, path=path)
+    assert len(TransitionStore(10, path=path, overwrite=True)) == 0
+    # even before it is first flushed
+    with pytest.raises(FileExistsError):
+        TransitionStore(100, path=path)
+
+
+def test_empty_store():
+    store = TransitionStore(10)
+    with pytest.raises(ValueError):
+        store.sample(1)
+    store.add(0, 1, -1.0, 1, False)
+    with pytest.raises(ValueError):
+        store.sample_episodes(1)
@@ -0,0 +1,47 @@
+import gym
+import numpy as np
+import pytest
+import gridworldsgym
+from gridworldsgym import planning
+from gridworldsgym.rollout import rollout
+
+
+def _serial_episode(env, policy, horizon, gamma, seed):
+    env.seed(seed)
+    state = env.reset()
+    episode_return, length = 0.0, 0
+    discount = 1.0
+    for t in range(horizon):
+        if policy.ndim == 1:
+            action = policy[state]
+        else:
+            action = env.unwrapped._sample(policy[state])
+        state, reward, done, info = env.step(action)
+        episode_return += discount * reward
+        length = t + 1
+        discount *= gamma
+        if done:
+            break
+    return episode_return, length
+
+
+@pytest.mark.parametrize('env_id', ['SlipperyGridWorld-v0', 'WindyGridWorld-v0', 'SlipperyCliffGridWorld-v0'])
+@pytest.mark.parametrize('stochastic', [False, True])
+def test_single_episode_matches_step(env_id, stochastic):
+    env = gym.make(env_id)
+    num_states, num_actions = env.observation_space.n, env.action_space.n
+    if stochastic:
+        policy = np.random.RandomState(0).dirichlet(np.ones(num_actions), size=num_states)
+    else:
+        policy = planning.value_iteration(env, gamma=0.9).policy
+    for seed in range(10):
+        result = rollout(env, policy, 1, 50, gamma=0.9, seed=seed)
+        assert (result.returns[0], result.lengths[0]) == _serial_episode(env, policy, 50, 0.9, seed)
+
+
+def test_returns_estimate_policy_values():
+    env = gym.make('SlipperyGridWorld-v0')
+    solution = planning.value_iteration(env, gamma=0.9)
+    result = rollout(env, solution.policy, 20000, 200, gamma=0.9, seed=0, count_visits=True)
+    assert abs(result.returns.mean() - solution.values[0]) < 0.01
+    assert result.visits.sum() == result.lengths.sum()
@@ -0,0 +1,126 @@
+import functools
+
+import gym
+import numpy as np
+import pytest
+import gridworldsgym
+from gridworldsgym.envs import GridWorldVectorEnv
+
+
+@pytest.mark.parametrize('env_id', ['SlipperyGridWorld-v0', 'WindyGridWorld-v0', 'SlipperyCliffGridWorld-v0'])
+def test_sample_batch_matches_sample(env_id):
+    model = gym.make(env_id).unwrapped.model
+    rng = np.random.RandomState(0)
+    states = rng.randint(model.num_states, size=1000)
+    actions = rng.randint(model.num_actions, size=1000)
+    u = rng.rand(1000)
+    expected = [model.sample(s, a, x) for s, a, x in zip(states, actions, u)]
+    assert np.array_equal(model.sample_batch(states, actions, u), expected)
+
+
+def test_vector_env_matches_single_env():
+    envs = GridWorldVectorEnv('CliffGridWorld-v0', 8)
+    env = gym.make('CliffGridWorld-v0')
+    states = envs.reset()
+    assert np.all(states == env.reset())
+    for action in [0, 1, 1, 2, 1, 1, 1, 1, 1, 1, 1, 1, 1, 2]:
+        state, reward, done, info = env.step(action)
+        states, rewards, dones, infos = envs.step(np.full(8, action))
+        assert np.all(infos['terminal_state'] == state)
+        assert np.all(rewards == reward) and np.all(dones == done) and np.all(infos['prob'] == info['prob'])
+        if done:
+            assert np.all(states == env.reset())
+        else:
+            assert np.all(states == state)
+
+
+def test_vector_env_accepts_registered_kwargs():
+    envs = GridWorldVectorEnv('GridWorld-v0', 4, width=6, height=5, slippery=True)
+    assert envs.env.width == 6 and envs.env.slippery
+    assert envs.single_observation_space.n == 30
+    assert envs.step(np.zeros(4, dtype=int))[0].shape == (4,)
+
+
+def test_shared_memory_vector_env_matches_vector_env():
+    from gridworldsgym.envs import SharedMemoryVectorEnv
+    envs = SharedMemoryVectorEnv('CliffGridWorld-v0', 10, num_workers=3)
+    reference = GridWorldVectorEnv('CliffGridWorld-v0', 10)
+    try:
+        assert np.array_equal(envs.reset(), reference.reset())
+        for action in [0, 1, 1, 2, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 2]:
+            result = envs.step(np.full(10, action))
+            expected = reference.step(np.full(10, action))
+            for array, expected_array in zip(result[:3], expected[:3]):
+                assert np.array_equal(array, expected_array)
+            assert np.array_equal(result[3]['terminal_state'], expected[3]['terminal_state'])
+    finally:
+        envs.close()
+
+
+def _rollout(envs, steps=40):
+    rng = np.random.RandomState(1)
+    trajectory = [envs.reset()]
+    for _ in range(steps):
+        states, rewards, dones, infos = envs.step(rng.randint(4, size=envs.num_envs))
+        trajectory.extend([states, rewards, dones])
+    return np.concatenate(trajectory)
+
+
+def test_streams_do_not_depend_on_block_size():
+    trajectories = []
+    for block_size in [1, 7, 1024]:
+        envs = GridWorldVectorEnv('SlipperyCliffGridWorld-v0', 6, block_size=block_size)
+        envs.seed(3)
+        trajectories.append(_rollout(envs))
+    assert np.array_equal(trajectories[0], trajectories[1]) and np.array_equal(trajectories[0], trajectories[2])
+
+
+def test_stream_of_copy_matches_single_env():
+    envs = GridWorldVectorEnv('SlipperyGridWorld-v0', 5, block_size=16)
+    envs.seed(11)
+    env = gym.make('SlipperyGridWorld-v0', block_size=3)
+    env.seed(np.random.SeedSequence(11).spawn(5)[2])
+    assert envs.reset()[2] == env.reset()
+    for action in [0, 1, 1, 1, 2, 0, 1, 1, 1, 3] * 5:
+        state, reward, done, info = env.step(action)
+        states, rewards, dones, infos = envs.step(np.full(5, action))
+        assert infos['terminal_state'][2] == state and rewards[2] == reward and dones[2] == done
+        if done:
+            assert states[2] == env.reset()
+
+
+def test_streams_do_not_depend_on_sharding():
+    from gridworldsgym.envs import SharedMemoryVectorEnv
+    reference = GridWorldVectorEnv('SlipperyCliffGridWorld-v0', 7, block_size=32)
+    reference.seed(5)
+    envs = SharedMemoryVectorEnv('SlipperyCliffGridWorld-v0', 7, num_workers=3, block_size=4)
+    try:
+        envs.seed(5)
+        assert np.array_equal(_rollout(envs), _rollout(reference))
+    finally:
+        envs.close()
+
+
+def test_shared_memory_vector_env_accepts_envs_and_factories():
+    from gridworldsgym.envs import SharedMemoryVectorEnv
+    reference = GridWorldVectorEnv('GridWorld-v0', 4, width=6, height=5)
+    expected = [reference.reset()] + [reference.step(np.full(4, 1))[0] for _ in range(3)]
+    for env in [functools.partial(gym.make, 'GridWorld-v0', width=6, height=5),
+                gym.make('GridWorld-v0', width=6, height=5)]:
+        envs = SharedMemoryVectorEnv(env, 4, num_workers=2)
+        try:
+            result = [envs.reset()] + [envs.step(np.full(4, 1))[0] for _ in range(3)]
+            assert np.array_equal(result, expected)
+            assert np.array_equal(envs.render(), reference.render())
+        finally:
+            envs.close()
+
+
+def test_shared_memory_vector_env_closes_with_dead_workers():
+    from gridworldsgym.envs import SharedMemoryVectorEnv
+    envs = SharedMemoryVectorEnv('CliffGridWorld-v0', 6, num_workers=3)
+    envs.reset()
+    envs.processes[1].terminate()
+    envs.processes[1].join()
+    envs.close(timeout=2)
+    assert not any(process.is_alive() for process in envs.processes)
@@ -0,0 +1,57 @@
+import gym
+import pytest
+import gridworldsgym
+from gridworldsgym.wrappers import EpisodeRecorder
+
+
+class ListWriter(object):
+    files = {}
+
+    def __init__(self, path, fps):
+        self.frames = ListWriter.files.setdefault(path, [])
+        self.closed = False
+
+    def append_data(self, frame):
+        self.frames.append(frame)
+
+    def close(self):
+        self.closed = True
+
+
+@pytest.mark.parametrize('background', [False, True])
+def test_episode_recorder(background):
+    ListWriter.files = {}
+    env = EpisodeRecorder(gym.make('CliffGridWorld-v0'), 'episode_{episode}.gif', frame_skip=2, downscale=4,
+                          background=background, writer_factory=ListWriter)
+    for _ in range(2):
+        env.reset()
+        for action in [0, 1, 1, 1, 1]:
+            env.step(action)
+    env.close()
+    assert sorted(ListWriter.files) == ['episode_0.gif', 'episode_1.gif']
+    # six frames per episode, reset included, of which every other one is kept
+    assert [len(frames) for frames in ListWriter.files.values()] == [3, 3]
+    assert ListWriter.files['episode_0.gif'][0].shape == (102, 302, 3)
+
+
+class FailingWriter(ListWriter):
+
+    def append_data(self, frame):
+        if len(self.frames) == 2:
+            raise IOError('disk full')
+        super(FailingWriter, self).append_data(frame)
+
+
+def test_background_errors_are_raised():
+    ListWriter.files = {}
+    env = EpisodeRecorder(gym.make('CliffGridWorld-v0'), 'episode.gif', background=True, queue_size=1,
+                          writer_factory=FailingWriter)
+    env.reset()
+    with pytest.raises(IOError):
+        for _ in range(100):
+            env.step(0)
+    with pytest.raises(IOError):
+        env.close()
+    with pytest.raises(RuntimeError):
+        env.reset()
+    env.close()
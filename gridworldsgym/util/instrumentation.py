@@ -0,0 +1,108 @@
+"""
+Opt-in counters and latency histograms of environment steps, resets, renders and model builds
+
+Environments check the module level enabled flag and do nothing else while it is False. Once enabled, each
+thread records into its own Stats, so recording needs no lock, and scrape() sums the Stats of all threads.
+The Stats of threads that have finished are folded into one total, so starting many threads does not grow it.
+"""
+import os
+import threading
+from collections import defaultdict
+
+# latencies are counted in power of two buckets of nanoseconds: bucket b holds [2 ** (b - 1), 2 ** b)
+NUM_BUCKETS = 48
+
+enabled = os.environ.get('GRIDWORLDSGYM_INSTRUMENTATION', '').lower() not in ('', '0', 'false', 'no', 'off')
+
+_local = threading.local()
+# (thread, Stats) of the threads that recorded and were running when last checked
+_all_stats = []
+_registry_lock = threading.Lock()
+
+
+class Stats(object):
+    """ Counters and timers of a single thread. A timer is a [count, total seconds, histogram] list. """
+
+    def __init__(self):
+        self.counters = defaultdict(int)
+        self.timers = {}
+
+    def count(self, name, n=1):
+        self.counters[name] += n
+
+    def record(self, name, seconds):
+        timer = self.timers.get(name)
+        if timer is None:
+            timer = self.timers[name] = [0, 0.0, [0] * NUM_BUCKETS]
+        timer[0] += 1
+        timer[1] += seconds
+        timer[2][min(int(seconds * 1e9).bit_length(), NUM_BUCKETS - 1)] += 1
+
+    def merge(self, other):
+        """ Adds the counters and timers of other, which may still be recording, to these. """
+        for name, value in list(other.counters.items()):
+            self.counters[name] += value
+        for name, (count, total, histogram) in list(other.timers.items()):
+            timer = self.timers.setdefault(name, [0, 0.0, [0] * NUM_BUCKETS])
+            timer[0] += count
+            timer[1] += total
+            timer[2] = [a + b for a, b in zip(timer[2], histogram)]
+
+
+# the totals of the threads that have finished
+_finished = Stats()
+
+
+def _retire_finished():
+    # called with _registry_lock held; a finished thread records nothing more, so its Stats can be merged
+    for thread, stats in [entry for entry in _all_stats if not entry[0].is_alive()]:
+        _finished.merge(stats)
+        _all_stats.remove((thread, stats))
+
+
+def enable():
+    global enabled
+    enabled = True
+
+
+def disable():
+    global enabled
+    enabled = False
+
+
+def thread_stats():
+    """ The Stats of the calling thread, made and registered on first use. """
+    stats = getattr(_local, 'stats', None)
+    if stats is None:
+        stats = _local.stats = Stats()
+        with _registry_lock:
+            _retire_finished()
+            _all_stats.append((threading.current_thread(), stats))
+    return stats
+
+
+def scrape():
+    """ Totals over all threads since the last reset, as a JSON serializable dict: counters by name, and for
+        every timer its count, total seconds and histogram as [upper bound in seconds, count] pairs of the
+        buckets that are not empty. """
+    totals = Stats()
+    with _registry_lock:
+        _retire_finished()
+        totals.merge(_finished)
+        all_stats = [stats for thread, stats in _all_stats]
+    for stats in all_stats:
+        totals.merge(stats)
+    return {
+        'counters': dict(totals.counters),
+        'timers': {name: {'count': count, 'total_seconds': total,
+                          'histogram': [[2 ** bucket * 1e-9, n] for bucket, n in enumerate(histogram) if n]}
+                   for name, (count, total, histogram) in totals.timers.items()},
+    }
+
+
+def reset():
+    """ Clears the Stats of every thread. Events recorded by other threads while this runs may be lost. """
+    with _registry_lock:
+        for stats in [stats for thread, stats in _all_stats] + [_finished]:
+            stats.counters.clear()
+            stats.timers.clear()
@@ -0,0 +1,150 @@
+"""
+Optional JIT compiled kernels for sampling steps and simulating episodes
+
+The kernels are plain Python loops over a TransitionModel's flat arrays, written so that Numba can compile them.
+With the default 'numpy' backend they are not used: TransitionModel and rollout run their NumPy code. With the
+'numba' backend, selected with use_backend or the GRIDWORLDSGYM_BACKEND environment variable, env.step,
+TransitionModel's sample and sample_rows, and so vector environments and agents, as well as rollout, call the
+compiled kernels instead. Both backends compare the same numbers in the same order, so they return identical results.
+"""
+import os
+import warnings
+from collections import namedtuple
+
+BACKENDS = ('numpy', 'numba')
+
+Kernels = namedtuple('Kernels', ['sample', 'sample_rows', 'step', 'rollout_steps'])
+
+
+def sample(indptr, row_length, cdf, row, u):
+    """ TransitionModel.sample for a row, state * num_actions + action: the index of the first outcome whose
+        cumulative probability exceeds u, else the first. """
+    # rows are row_length long if it is positive, and given by indptr otherwise
+    start = row * row_length if row_length > 0 else indptr[row]
+    stop = start + row_length if row_length > 0 else indptr[row + 1]
+    for i in range(start, stop):
+        if cdf[i] > u:
+            return i
+    return start
+
+
+def step(indptr, row_length, cdf, next_states, rewards, dones, probs, row, u):
+    """ FiniteStateMDP.step's sample and lookups in one call: the next state, reward, done and probability of
+        the outcome of row that u selects, as Python scalars once compiled, except for the reward. """
+    start = row * row_length if row_length > 0 else indptr[row]
+    stop = start + row_length if row_length > 0 else indptr[row + 1]
+    index = start
+    for i in range(start, stop):
+        if cdf[i] > u:
+            index = i
+            break
+    return int(next_states[index]), rewards[index], bool(dones[index]), float(probs[index])
+
+
+def sample_rows(indptr, row_length, cdf, rows, u, out):
+    """ TransitionModel.sample_rows written to out: the outcome after all those whose cumulative probability
+        is at most u, else the first. """
+    for k in range(len(rows)):
+        start = rows[k] * row_length if row_length > 0 else indptr[rows[k]]
+        stop = start + row_length if row_length > 0 else indptr[rows[k] + 1]
+        index = start
+        while index < stop and cdf[index] <= u[k]:
+            index += 1
+        out[k] = start if index == stop else index
+    return out
+
+
+def rollout_steps(indptr, row_length, cdf, next_states, rewards, dones, num_actions, policy_rows, policy_cdf,
+                  states, episodes, num_active, t, horizon, discounts, uniforms, position, returns, lengths,
+                  visits):
+    """ Advances the first num_active of rollout's episodes, whose states and indices are in states and episodes,
+        from step t until horizon, until none is left, or until the next step needs more uniforms than are left
+        after position. policy_cdf is [num_actions, num_states] for a stochastic policy and empty otherwise,
+        visits empty unless they are counted. Returns the new num_active, t and position.
+    """
+    stochastic = policy_cdf.shape[0] > 0
+    draws = 2 if stochastic else 1
+    while t < horizon and num_active > 0 and position + draws * num_active <= len(uniforms):
+        # every step draws the actions of all active episodes first, then their outcomes
+        outcome_position = position + (draws - 1) * num_active
+        kept = 0
+        for k in range(num_active):
+            state = states[k]
+            if len(visits):
+                visits[state] += 1
+            if stochastic:
+                action = 0
+                for a in range(num_actions):
+                    if policy_cdf[a, state] <= uniforms[position + k]:
+                        action += 1
+                if action == num_actions:
+                    action = 0
+                row = state * num_actions + action
+            else:
+                row = policy_rows[state]
+            start = row * row_length if row_length > 0 else indptr[row]
+            stop = start + row_length if row_length > 0 else indptr[row + 1]
+            index = start
+            while index < stop and cdf[index] <= uniforms[outcome_position + k]:
+                index += 1
+            if index == stop:
+                index = start
+            episode = episodes[k]
+            returns[episode] += discounts[t] * rewards[index]
+            lengths[episode] = t + 1
+            if not dones[index]:
+                states[kept] = next_states[index]
+                episodes[kept] = episode
+                kept += 1
+        position += draws * num_active
+        num_active = kept
+        t += 1
+    return num_active, t, position
+
+
+PYTHON_KERNELS = Kernels(sample, sample_rows, step, rollout_steps)
+
+# the name of the selected backend, and its compiled kernels, None for numpy
+backend = 'numpy'
+compiled = None
+_numba_kernels = None
+
+
+def use_backend(name='auto'):
+    """ Selects the 'numpy' or 'numba' backend, or with 'auto' numba if it is installed and numpy otherwise.
+        Kernels are compiled on first use and cached on disk by Numba. Returns the name of the selected backend.
+    """
+    global backend, compiled, _numba_kernels
+    if name not in BACKENDS + ('auto',):
+        raise ValueError('backend must be one of {}, got {!r}'.format(BACKENDS + ('auto',), name))
+    if name != 'numpy':
+        try:
+            import numba
+        except ImportError:
+            if name == 'auto':
+                return use_backend('numpy')
+            raise ImportError('''
+            Cannot import numba, which is needed for the numba backend.
+            HINT: you can install it with 'pip install gridworldsgym[fast]' or 'pip install numba', or use the
+            'numpy' backend.
+            ''')
+        if _numba_kernels is None:
+            _numba_kernels = Kernels(*[numba.njit(cache=True, nogil=True)(kernel) for kernel in PYTHON_KERNELS])
+        backend, compiled = 'numba', _numba_kernels
+    else:
+        backend, compiled = 'numpy', None
+    return backend
+
+
+def _use_environment_backend():
+    # a backend that cannot be used warns instead of failing the import of gridworldsgym
+    name = os.environ.get('GRIDWORLDSGYM_BACKEND', 'numpy')
+    try:
+        use_backend(name)
+    except (ImportError, ValueError) as e:
+        warnings.warn('GRIDWORLDSGYM_BACKEND={!r} cannot be used, falling back to numpy: {}'.format(
+            name, ' '.join(str(e).split())))
+        use_backend('numpy')
+
+
+_use_environment_backend()
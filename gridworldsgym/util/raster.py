@@ -0,0 +1,139 @@
+"""
+Software rendering of GridWorldV0 frames with NumPy, for render(mode='rgb_array') without OpenGL or a display
+"""
+import numpy as np
+
+WHITE = (1.0, 1.0, 1.0)
+BLACK = (0.0, 0.0, 0.0)
+GOAL_COLOR = (0.0, 1.0, 0.0)
+TERMINAL_COLOR = (1.0, 0.0, 0.0)
+ILLEGAL_COLOR = (0.25, 0.25, 0.25)
+AGENT_COLOR = (95 / 256, 125 / 256, 153 / 256)
+
+
+def to_rgb(color):
+    return np.round(np.asarray(color) * 255).astype(np.uint8)
+
+
+def fill_rect(image, x0, x1, y0, y1, color):
+    # Covers the pixels whose centres lie in [x0, x1) by (y0, y1], which is OpenGL's rule once its y up
+    # coordinates are flipped into image rows.
+    c0, c1 = int(np.ceil(x0 - 0.5)), int(np.ceil(x1 - 0.5))
+    r0, r1 = int(np.floor(y0 - 0.5)) + 1, int(np.floor(y1 - 0.5)) + 1
+    image[max(r0, 0):max(r1, 0), max(c0, 0):max(c1, 0)] = to_rgb(color)
+
+
+def triangle_pixels(vertices):
+    """ Rows and columns of the pixels whose centres lie inside the triangle with the given (x, y) vertices. """
+    vertices = np.asarray(vertices, dtype=np.float64)
+    c0, r0 = np.floor(vertices.min(axis=0)).astype(int)
+    c1, r1 = np.ceil(vertices.max(axis=0)).astype(int) + 1
+    rows, cols = np.mgrid[r0:r1, c0:c1]
+    x, y = cols + 0.5, rows + 0.5
+    sides = []
+    for (ax, ay), (bx, by) in zip(vertices, np.roll(vertices, -1, axis=0)):
+        sides.append((bx - ax) * (y - ay) - (by - ay) * (x - ax))
+    sides = np.stack(sides)
+    inside = np.all(sides >= 0, axis=0) | np.all(sides <= 0, axis=0)
+    return rows[inside], cols[inside]
+
+
+class GridRasterizer(object):
+    """ Draws the same picture as GridWorldV0.render's pyglet viewer: grid lines and the goal, terminal and
+        illegal cells are rasterized once into a static layer, so each frame is a copy of that layer with
+        the agent sprite for the current state and heading blitted on top. square_size is the side of a cell
+        in pixels, 100 in the pyglet viewer.
+    """
+
+    def __init__(self, env, square_size=100, line_width=5):
+        self.width = env.width
+        self.height = env.height
+        self.square_size = square_size
+        self.line_width = line_width
+        self.screen_width = square_size * env.width + line_width
+        self.screen_height = square_size * env.height + line_width
+        self.static_layer = self._draw_static(env)
+        self.agent_color = to_rgb(AGENT_COLOR)
+        self._sprites = {}
+
+    def _cell_center(self, row, col):
+        offset = self.square_size / 2 + self.line_width / 2
+        return col * self.square_size + offset, row * self.square_size + offset
+
+    def _draw_static(self, env):
+        sq, lw = self.square_size, self.line_width
+        image = np.empty((self.screen_height, self.screen_width, 3), dtype=np.uint8)
+        image[:] = to_rgb(WHITE)
+        for i in range(self.width + 1):
+            fill_rect(image, i * sq, i * sq + lw, lw, self.screen_height, BLACK)
+        for j in range(self.height + 1):
+            fill_rect(image, 0, self.screen_width, self.screen_height - j * sq - lw, self.screen_height - j * sq, BLACK)
+        half = 0.48 * sq
+        for cells, color in [(env.goal_states, GOAL_COLOR), (env.terminal_states, TERMINAL_COLOR),
+                             (env.illegal_states, ILLEGAL_COLOR)]:
+            for row, col in cells:
+                x, y = self._cell_center(row, col)
+                fill_rect(image, x - half, x + half, y - half, y + half, color)
+        image.flags.writeable = False
+        return image
+
+    def redraw_cell(self, env, row, col):
+        """ Redraws the cell at (row, col) of the static layer, e.g. after it became or stopped being a goal,
+            terminal or illegal cell, exactly as _draw_static would. Only that cell's pixels are touched. """
+        sq, lw = self.square_size, self.line_width
+        half = 0.48 * sq
+        x, y = self._cell_center(row, col)
+        x0, x1, y0, y1 = x - half, x + half, y - half, y + half
+        image = self.static_layer
+        image.flags.writeable = True
+        fill_rect(image, x0, x1, y0, y1, WHITE)
+        # the parts of the grid lines the cell's square covers
+        for i in (col, col + 1):
+            fill_rect(image, max(i * sq, x0), min(i * sq + lw, x1), max(lw, y0), min(self.screen_height, y1), BLACK)
+        for j in (self.height - row - 1, self.height - row):
+            top = self.screen_height - j * sq
+            fill_rect(image, max(0, x0), min(self.screen_width, x1), max(top - lw, y0), min(top, y1), BLACK)
+        state = row * self.width + col
+        for mask, color in [(env.goal_mask, GOAL_COLOR), (env.terminal_mask, TERMINAL_COLOR),
+                            (env.illegal_mask, ILLEGAL_COLOR)]:
+            if mask[state]:
+                fill_rect(image, x0, x1, y0, y1, color)
+        image.flags.writeable = False
+
+    def sprite(self, heading):
+        """ Pixels of the agent in cell (0, 0) facing heading, as rows and columns. """
+        if heading not in self._sprites:
+            size = self.square_size / 2
+            x, y = self._cell_center(0, 0)
+            # the viewer draws the agent line_width below the cell centre, in y up coordinates
+            y += self.line_width
+            cos, sin = np.cos(heading), np.sin(heading)
+            vertices = [(x + vx * cos - vy * sin, y - (vx * sin + vy * cos))
+                        for vx, vy in [(-size / 2, -size / 2), (0.0, size / 2), (size / 2, -size / 2)]]
+            rows, cols = triangle_pixels(vertices)
+            keep = (rows >= 0) & (cols >= 0)
+            self._sprites[heading] = rows[keep], cols[keep]
+        return self._sprites[heading]
+
+    def render(self, state, heading):
+        frame = self.static_layer.copy()
+        rows, cols = self.sprite(heading)
+        row, col = divmod(int(state), self.width)
+        frame[rows + row * self.square_size, cols + col * self.square_size] = self.agent_color
+        return frame
+
+    def render_batch(self, states, headings, out=None):
+        """ Frames for arrays of states and headings at once, as an [n, screen_height, screen_width, 3] array. """
+        states = np.asarray(states)
+        headings = np.broadcast_to(headings, states.shape)
+        if out is None:
+            out = np.empty((len(states),) + self.static_layer.shape, dtype=np.uint8)
+        out[:] = self.static_layer
+        state_rows, state_cols = np.divmod(states, self.width)
+        for heading in np.unique(headings):
+            envs = np.flatnonzero(headings == heading)
+            rows, cols = self.sprite(float(heading))
+            out[envs[:, None],
+                rows + state_rows[envs, None] * self.square_size,
+                cols + state_cols[envs, None] * self.square_size] = self.agent_color
+        return out
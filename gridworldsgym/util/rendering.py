@@ -64,6 +64,10 @@ class Viewer(object):
         self.isopen = True
         self.geoms = []
         self.onetime_geoms = []
+        self.static_geoms = []
+        self.static_list = None
+        # labels created with batch=viewer.batch are drawn together in one call per frame
+        self.batch = pyglet.graphics.Batch()
         self.transform = Transform()
 
         glEnable(GL_BLEND)
@@ -86,6 +90,26 @@ class Viewer(object):
     def add_geom(self, geom):
         self.geoms.append(geom)
 
+    def add_static(self, geom):
+        """ Adds a geom that does not change between frames. Static geoms are compiled once into a display
+            list that is replayed every frame, until invalidate_static() is called. """
+        self.static_geoms.append(geom)
+        self.invalidate_static()
+
+    def invalidate_static(self):
+        if self.static_list is not None:
+            glDeleteLists(self.static_list, 1)
+            self.static_list = None
+
+    def _render_static(self):
+        if self.static_list is None:
+            self.static_list = glGenLists(1)
+            glNewList(self.static_list, GL_COMPILE)
+            for geom in self.static_geoms:
+                geom.render()
+            glEndList()
+        glCallList(self.static_list)
+
     def add_onetime(self, geom):
         self.onetime_geoms.append(geom)
 
@@ -95,10 +119,13 @@ class Viewer(object):
         self.window.switch_to()
         self.window.dispatch_events()
         self.transform.enable()
+        if self.static_geoms:
+            self._render_static()
         for geom in self.geoms:
             geom.render()
         for geom in self.onetime_geoms:
             geom.render()
+        self.batch.draw()
         self.transform.disable()
         arr = None
         if return_rgb_array:
@@ -304,14 +331,22 @@ def make_capsule(length, width):
 
 
 class Label(Geom):
-    def __init__(self, x, y, string=str(0.0)):
+    def __init__(self, x, y, string=str(0.0), batch=None):
         super(Label, self).__init__()
+        self.text = string
         self.label = pyglet.text.Label(string,
                                        font_name='Times New Roman',
                                        font_size=20,
                                        x=x, y=y,
                                        anchor_x='center', anchor_y='center',
-                                       color=(0, 0, 0, 255))
+                                       color=(0, 0, 0, 255),
+                                       batch=batch)
+
+    def set_text(self, string):
+        # assigning pyglet's label text lays the label out again, even when the text is the same
+        if string != self.text:
+            self.text = string
+            self.label.text = string
 
     def render1(self):
         self.label.draw()
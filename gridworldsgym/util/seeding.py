@@ -0,0 +1,113 @@
+"""
+Independent random streams from a single root seed, and blocks of uniforms drawn ahead of use
+"""
+import copy
+
+import numpy as np
+from gym import error
+
+
+def seed_sequence(seed=None):
+    """ A SeedSequence for a non-negative int seed, fresh entropy when seed is None, or seed itself. """
+    if isinstance(seed, np.random.SeedSequence):
+        return seed
+    if seed is not None and not (isinstance(seed, (int, np.integer)) and seed >= 0):
+        raise error.Error('Seed must be a non-negative integer, a SeedSequence or omitted, not {}'.format(seed))
+    return np.random.SeedSequence(seed)
+
+
+def np_random(seed=None):
+    """ A PCG64 Generator and the SeedSequence it was seeded from. """
+    sequence = seed_sequence(seed)
+    return np.random.Generator(np.random.PCG64(sequence)), sequence
+
+
+def spawn(seed, start, stop):
+    """ Children start to stop of seed's SeedSequence, the same streams as seed_sequence(seed).spawn(stop)[start:]
+        of a fresh root. The children before start are never made, so a process that owns a shard of the
+        environments gets exactly the streams those environments would get in a single process.
+    """
+    root = seed_sequence(seed)
+    return [np.random.SeedSequence(root.entropy, spawn_key=root.spawn_key + (i,), pool_size=root.pool_size)
+            for i in range(start, stop)]
+
+
+def get_rng_state(rng):
+    """ The state of a RandomState or a Generator, for set_rng_state. """
+    if isinstance(rng, np.random.Generator):
+        return rng.bit_generator.state
+    return rng.get_state()
+
+
+def set_rng_state(rng, state):
+    if isinstance(rng, np.random.Generator):
+        rng.bit_generator.state = state
+    else:
+        rng.set_state(state)
+
+
+def copy_rng(rng):
+    """ An independent RandomState or Generator in the same state as rng. """
+    if isinstance(rng, np.random.Generator):
+        # seeding a throwaway PCG64 and overwriting its state is twice as fast as deepcopy
+        generator = np.random.Generator(type(rng.bit_generator)(0))
+        generator.bit_generator.state = rng.bit_generator.state
+        return generator
+    return copy.deepcopy(rng)
+
+
+class UniformBuffer(object):
+    """ Uniforms in [0, 1) from generator, drawn block_size at a time. A Generator fills a block with exactly
+        the numbers that as many single draws would return, so the values are independent of block_size.
+    """
+
+    def __init__(self, generator, block_size=1024):
+        self.generator = generator
+        self.block_size = block_size
+        self.block = np.empty(block_size)
+        self.position = block_size
+
+    def next(self):
+        if self.position == self.block_size:
+            self.generator.random(out=self.block)
+            self.position = 0
+        value = self.block[self.position]
+        self.position += 1
+        return float(value)
+
+    def get_state(self):
+        """ The generator's state and the uniforms of the current block not yet used. """
+        return self.generator.bit_generator.state, self.block[self.position:].copy()
+
+    def set_state(self, state):
+        generator_state, rest = state
+        self.generator.bit_generator.state = generator_state
+        self.position = self.block_size - len(rest)
+        self.block[self.position:] = rest
+
+
+class UniformBlocks(object):
+    """ One UniformBuffer per environment, stored as a [len(generators), block_size] array so that a batch of
+        environments takes its next uniforms in a single vectorized step. Each environment only ever draws
+        from its own generator, so its values depend neither on block_size nor on the other environments.
+    """
+
+    def __init__(self, generators, block_size=1024):
+        self.generators = generators
+        self.block_size = block_size
+        self.blocks = np.empty((len(generators), block_size))
+        self.positions = np.full(len(generators), block_size, dtype=np.int64)
+        self._rows = np.arange(len(generators))
+
+    def take(self, envs=None):
+        """ The next uniform of each of the environments envs, which must not repeat, or of all of them. """
+        if envs is None:
+            envs = self._rows
+        positions = self.positions[envs]
+        exhausted = envs[positions == self.block_size]
+        for env in exhausted:
+            self.generators[env].random(out=self.blocks[env])
+        positions[positions == self.block_size] = 0
+        values = self.blocks[envs, positions]
+        self.positions[envs] = positions + 1
+        return values
@@ -0,0 +1,2 @@
+from gridworldsgym.wrappers.recorder import EpisodeRecorder, TransitionRecorder
+from gridworldsgym.wrappers.observations import EncodedObservation
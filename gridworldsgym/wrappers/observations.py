@@ -0,0 +1,18 @@
+import gym
+
+from gridworldsgym.envs.observations import ObservationEncoder
+
+
+class EncodedObservation(gym.ObservationWrapper):
+    """ Replaces the state index observations of a GridWorldV0-family environment by their ObservationEncoder
+        encoding: 'one_hot', 'coordinates', 'normalized' or 'egocentric' views of view_size by view_size cells.
+        Observations are read-only rows of the encoder's table, so stepping allocates nothing for them.
+    """
+
+    def __init__(self, env, mode='one_hot', view_size=3):
+        super(EncodedObservation, self).__init__(env)
+        self.encoder = ObservationEncoder(env, mode, view_size)
+        self.observation_space = self.encoder.observation_space
+
+    def observation(self, observation):
+        return self.encoder.encode_state(observation)
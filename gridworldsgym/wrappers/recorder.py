@@ -0,0 +1,148 @@
+import queue
+import threading
+
+import gym
+
+
+def imageio_writer(path, fps):
+    try:
+        import imageio
+    except ImportError:
+        raise ImportError('''
+        Cannot import imageio.
+        HINT: you can install imageio directly via 'pip install imageio', and 'pip install imageio-ffmpeg'
+        to write MP4 files.
+        ''')
+    return imageio.get_writer(path, fps=fps)
+
+
+class EpisodeRecorder(gym.Wrapper):
+    """ Streams rgb_array frames to a video or GIF encoder as the episode runs, so that no episode is ever
+        held in memory. Every frame_skip-th frame is kept and downscaled by taking every downscale-th pixel.
+        If path contains '{episode}' each episode is written to its own file, otherwise all episodes go to
+        one. With background=True frames are encoded on a separate thread, through a queue of at most
+        queue_size frames; an error of the writer there is raised by the next reset, step or close, and
+        later frames are dropped. writer_factory(path, fps) must return an object with append_data(frame) and
+        close(); by default it is an imageio writer, which picks the format from the file extension. A closed
+        recorder cannot record again.
+    """
+
+    def __init__(self, env, path, fps=10, frame_skip=1, downscale=1, background=False, queue_size=64,
+                 writer_factory=imageio_writer):
+        super(EpisodeRecorder, self).__init__(env)
+        self.path = path
+        self.fps = fps
+        self.frame_skip = frame_skip
+        self.downscale = downscale
+        self.writer_factory = writer_factory
+        self.episode = -1
+        self.frame_count = 0
+        self.writer = None
+        self.opened = False
+        self.queue = None
+        self.thread = None
+        self.closed = False
+        self._error = None
+        if background:
+            self.queue = queue.Queue(maxsize=queue_size)
+            self.thread = threading.Thread(target=self._encode, daemon=True)
+            self.thread.start()
+
+    def reset(self, **kwargs):
+        observation = self.env.reset(**kwargs)
+        self.episode += 1
+        self.frame_count = 0
+        if not self.opened or '{episode}' in self.path:
+            self._submit(('open', self.path.format(episode=self.episode)))
+            self.opened = True
+        self._record()
+        return observation
+
+    def step(self, action):
+        observation, reward, done, info = self.env.step(action)
+        self._record()
+        return observation, reward, done, info
+
+    def _record(self):
+        if self.frame_count % self.frame_skip == 0:
+            frame = self.env.render(mode='rgb_array')
+            if self.downscale > 1:
+                frame = frame[::self.downscale, ::self.downscale]
+            self._submit(('frame', frame))
+        self.frame_count += 1
+
+    def _submit(self, item):
+        if self.closed:
+            raise RuntimeError('cannot record with a closed EpisodeRecorder')
+        if self._error is not None:
+            raise self._error
+        if self.queue is None:
+            self._handle(item)
+        else:
+            self.queue.put(item)
+
+    def _handle(self, item):
+        kind, value = item
+        if kind == 'frame':
+            self.writer.append_data(value)
+            return
+        if self.writer is not None:
+            self.writer.close()
+            self.writer = None
+        if kind == 'open':
+            self.writer = self.writer_factory(value, self.fps)
+
+    def _encode(self):
+        # keeps draining the queue after an error, so that _submit and close never block on a full queue
+        while True:
+            item = self.queue.get()
+            if self._error is None:
+                try:
+                    self._handle(item)
+                except Exception as e:
+                    self._error = e
+            if item[0] == 'close':
+                return
+
+    def close(self):
+        if not self.closed:
+            self.closed = True
+            if self.thread is not None:
+                self.queue.put(('close', None))
+                self.thread.join()
+                self.thread = None
+                self.queue = None
+            else:
+                self._handle(('close', None))
+            self.opened = False
+        error, self._error = self._error, None
+        result = self.env.close()
+        if error is not None:
+            raise error
+        return result
+
+
+class TransitionRecorder(gym.Wrapper):
+    """ Logs every step of a FiniteStateMDP into a TransitionStore, by state index whatever the observations
+        are: the state, action, reward, next state, done and info['prob']. A reset ends the current episode
+        in the store, so episodes cut short by a reset or a time limit are kept as they were played.
+    """
+
+    def __init__(self, env, store):
+        super(TransitionRecorder, self).__init__(env)
+        self.store = store
+
+    def reset(self, **kwargs):
+        self.store.end_episode()
+        return self.env.reset(**kwargs)
+
+    def step(self, action):
+        unwrapped = self.env.unwrapped
+        state = unwrapped.state
+        observation, reward, done, info = self.env.step(action)
+        self.store.add(state, action, reward, unwrapped.state, done, info['prob'])
+        return observation, reward, done, info
+
+    def close(self):
+        self.store.close()
+        return self.env.close()
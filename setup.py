@@ -9,6 +9,11 @@ setup(name='gridworldsgym',
           'gym==0.15.7',
           'pyglet==1.3.2'
       ],
+      extras_require={
+          'recording': ['imageio'],
+          'planning': ['scipy'],
+          'fast': ['numba']
+      },
       packages=find_packages(),
       python_requires='>=3.6',
       include_package_data=True,